@@ -0,0 +1,75 @@
+"""
+Per-tick cost of clipboard change detection with 1 MB payloads.
+
+Compares the old tick (strip + frontmatter regex/YAML + sha256 on every
+tick) with ClipboardFilter, for an unchanged clipboard holding either a
+large log or a large brainstorm.
+
+    python benchmarks/bench_clipboard_filter.py [--size-mb 1] [--ticks 200]
+"""
+import argparse
+import time
+
+from pcos.clipboard_watcher import ClipboardFilter, extract_brainstorm_metadata, hash_text
+
+ALLOWED_TAGS = {"brainstorm", "pcos"}
+
+
+def make_payloads(size: int) -> dict:
+    line = "2026-01-01T00:00:00Z INFO request served path=/api/items status=200\n"
+    log = (line * (size // len(line) + 1))[:size]
+
+    header = "---\nproject: demo\ntags: [brainstorm, pcos]\n---\n"
+    brainstorm = header + ("- idea\n" * ((size - len(header)) // 7 + 1))[: size - len(header)]
+
+    return {"log": log, "brainstorm": brainstorm}
+
+
+def old_tick(text: str):
+    text = text.strip()
+    if not text:
+        return None
+    metadata = extract_brainstorm_metadata(text, allowed_tags=ALLOWED_TAGS)
+    if not metadata:
+        return None
+    return hash_text(text)
+
+
+def new_tick(flt: ClipboardFilter, text: str):
+    candidate = flt.check(text)
+    if candidate is not None:
+        flt.settle()  # the watcher settles once the brainstorm is captured
+    return candidate
+
+
+def per_tick_us(fn, ticks: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        fn()
+    return (time.perf_counter() - t0) / ticks * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    parser.add_argument("--ticks", type=int, default=200)
+    args = parser.parse_args()
+
+    payloads = make_payloads(int(args.size_mb * 1024 * 1024))
+
+    print(f"{'payload':<12}{'old tick':>14}{'filter tick':>14}")
+    for name, text in payloads.items():
+        # Polling backends hand back a fresh string object every tick.
+        ticks = [text[:1] + text[1:] for _ in range(args.ticks)]
+        it = iter(ticks)
+        old = per_tick_us(lambda: old_tick(next(it)), args.ticks)
+
+        flt = ClipboardFilter(ALLOWED_TAGS)
+        it = iter(ticks)
+        new = per_tick_us(lambda: new_tick(flt, next(it)), args.ticks)
+
+        print(f"{name:<12}{old:>12.0f}us{new:>12.0f}us")
+
+
+if __name__ == "__main__":
+    main()
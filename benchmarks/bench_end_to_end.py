@@ -0,0 +1,273 @@
+"""
+End-to-end throughput and latency of `pcos capture`, `contract --all`,
+`publish --all` and `schedule --all` against the local stand-ins of
+fake_services.py, for a growing number of tickets (at most 9 per project,
+the contract limit, so 1000 tickets are 112 projects).
+
+Every command runs in a fresh interpreter under `--profile`, as a user
+would run it; per-request latencies are read from its trace. Each run is
+appended to benchmarks/results/end_to_end.jsonl, one line per ticket count
+keyed by git commit, and compared with the latest run of another commit
+with the same settings, so regressions show up across commits.
+
+    python benchmarks/bench_end_to_end.py [--tickets 10 100 1000] [--latency-ms 5] [--llm-chunk-ms 1] [--page-size 100] [--jobs 4] [--http2] [--github-backend rest|graphql] [--no-record]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fake_services import start_services
+from pcos.defaults import DEFAULT_WORKERS
+from pcos.parser import MAX_TICKETS
+
+RESULTS_PATH = Path(__file__).parent / "results" / "end_to_end.jsonl"
+STAGES = ("capture", "contract", "publish", "schedule")
+PCOS = "from pcos.cli import app; app()"
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))]
+
+
+def git(*args) -> str:
+    try:
+        proc = subprocess.run(["git", *args], capture_output=True, text=True, cwd=Path(__file__).parent)
+    except OSError:
+        return ""
+    return proc.stdout.strip() if proc.returncode == 0 else ""
+
+
+def project_sizes(tickets: int) -> list[int]:
+    full, rest = divmod(tickets, MAX_TICKETS)
+    return [MAX_TICKETS] * full + ([rest] if rest else [])
+
+
+def write_workspace(
+    root: Path,
+    services: dict,
+    sizes: list[int],
+    http2: bool = False,
+    github_backend: str = "rest",
+) -> dict:
+    """
+    A HOME with Google credentials, a config.yaml pointing at the stand-ins
+    and one brainstorm per project. Returns the environment to run pcos in.
+    """
+    home = root / "home"
+    config_dir = home / ".config/closure-os"
+    config_dir.mkdir(parents=True)
+    # A valid token: the Calendar client skips the OAuth flow.
+    (config_dir / "token.json").write_text(json.dumps({
+        "token": "bench",
+        "refresh_token": "bench",
+        "client_id": "bench",
+        "client_secret": "bench",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "expiry": "2099-01-01T00:00:00Z",
+    }))
+
+    (root / "config.yaml").write_text(
+        "vault_name: bench\n"
+        f"obsidian_api_base: {services['obsidian'].url}\n"
+        "projects_root: projects\n"
+        "github:\n"
+        f"  api_url: {services['github'].url}\n"
+        f"  backend: {github_backend}\n"
+        "calendar:\n"
+        "  calendar_id: primary\n"
+        f"  api_root: {services['calendar'].url}/\n"
+        "  slot_minutes: 60\n"
+        "  work_hours:\n    start: \"09:00\"\n    end: \"18:00\"\n"
+        "  horizon_days: 3650\n"  # 1000 tickets take several years of slots
+        "llm:\n"
+        f"  api_base: {services['openai'].url}/v1\n"
+        "  tokens_per_minute: 1000000000\n"  # measure pcos, not the budget
+        "http:\n"
+        f"  http2: {'true' if http2 else 'false'}\n"
+    )
+
+    inputs = root / "brainstorms"
+    inputs.mkdir()
+    for i, size in enumerate(sizes):
+        items = "".join(f"- [ ] Task {t + 1} of project {i}\n" for t in range(size))
+        (inputs / f"bench-{i:03d}.md").write_text(
+            f"---\nproject: bench-{i:03d}\ntags: [brainstorm]\n---\n# Bench {i}\n\n{items}"
+        )
+
+    return {
+        **os.environ,
+        "HOME": str(home),
+        "GITHUB_TOKEN": "bench",
+        "OPENAI_API_KEY": "bench",
+        "OBSIDIAN_API_KEY": "bench",
+    }
+
+
+def run_pcos(args: list, root: Path, env: dict) -> tuple[float, list]:
+    """
+    Run one pcos command; returns (wall seconds, trace events).
+    """
+    trace = root / "trace.json"
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", PCOS, "--profile", "--trace-file", str(trace), *args],
+        cwd=root,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - t0
+
+    if proc.returncode != 0:
+        sys.exit(f"pcos {' '.join(args)} failed ({proc.returncode}):\n{proc.stdout}{proc.stderr}")
+    return elapsed, json.loads(trace.read_text())["traceEvents"]
+
+
+def stage_stats(wall: float, tickets: int, events: list, calls: list | None = None) -> dict:
+    requests_ms = [e["dur"] / 1000 for e in events if e["cat"] == "http"]
+    stats = {
+        "wall_s": round(wall, 3),
+        "tickets_per_s": round(tickets / wall, 1),
+        "requests": len(requests_ms),
+        "request_p50_ms": round(percentile(requests_ms, 50), 2),
+        "request_p95_ms": round(percentile(requests_ms, 95), 2),
+    }
+    if calls:
+        stats["call_p50_ms"] = round(percentile(calls, 50) * 1000, 1)
+        stats["call_p95_ms"] = round(percentile(calls, 95) * 1000, 1)
+    return stats
+
+
+def run_scale(tickets: int, args) -> dict:
+    sizes = project_sizes(tickets)
+    services = start_services(args.latency_ms, args.page_size, args.github_rate_limit, args.llm_chunk_ms)
+    stages = {}
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            env = write_workspace(root, services, sizes, args.http2, args.github_backend)
+
+            # One process per capture, like the clipboard watcher does.
+            calls, events = [], []
+            for brainstorm in sorted((root / "brainstorms").iterdir()):
+                elapsed, trace = run_pcos(
+                    ["capture", "--project", brainstorm.stem, "--input", str(brainstorm)], root, env
+                )
+                calls.append(elapsed)
+                events += trace
+            stages["capture"] = stage_stats(sum(calls), tickets, events, calls)
+
+            jobs = str(args.jobs)
+            for stage, argv in (
+                ("contract", ["contract", "--all", "--jobs", jobs]),
+                ("publish", ["publish", "--all", "--jobs", jobs, "--workers", jobs]),
+                ("schedule", ["schedule", "--all", "--workers", jobs]),
+            ):
+                elapsed, trace = run_pcos(argv, root, env)
+                stages[stage] = stage_stats(elapsed, tickets, trace)
+    finally:
+        for service in services.values():
+            service.stop()
+
+    issues = sum(len(r["issues"]) for r in services["github"].repos.values())
+    events = len(services["calendar"].events)
+    if issues != tickets or events != tickets:
+        print(f"  warning: {issues} issues and {events} events for {tickets} tickets")
+
+    return {"tickets": tickets, "projects": len(sizes), "stages": stages}
+
+
+def load_results() -> list[dict]:
+    if not RESULTS_PATH.exists():
+        return []
+    return [json.loads(line) for line in RESULTS_PATH.read_text().splitlines() if line.strip()]
+
+
+def print_result(record: dict, baseline: dict | None):
+    label = f"vs {baseline['commit']}" if baseline else ""
+    print(
+        f"{record['tickets']} tickets ({record['projects']} projects)\n"
+        f"{'stage':<10}{'wall (s)':>10}{'tickets/s':>11}{'requests':>10}"
+        f"{'p50 (ms)':>10}{'p95 (ms)':>10}{label:>16}"
+    )
+    for stage in STAGES:
+        s = record["stages"][stage]
+        delta = ""
+        if baseline and stage in baseline["stages"]:
+            before = baseline["stages"][stage]["wall_s"]
+            delta = f"{(s['wall_s'] - before) / before * 100:+.0f}% wall"
+        print(
+            f"{stage:<10}{s['wall_s']:>10.2f}{s['tickets_per_s']:>11.1f}{s['requests']:>10}"
+            f"{s['request_p50_ms']:>10.1f}{s['request_p95_ms']:>10.1f}{delta:>16}"
+        )
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickets", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--latency-ms", type=float, default=5, help="Added to every request")
+    parser.add_argument("--llm-chunk-ms", type=float, default=1, help="Delay between streamed chunks")
+    parser.add_argument("--page-size", type=int, default=100, help="Max issues per GitHub page")
+    parser.add_argument("--github-rate-limit", type=int, default=5000, help="Requests per hour")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--http2", action="store_true", help="Send through the HTTP/2 transport (needs httpx[http2])")
+    parser.add_argument("--github-backend", choices=("rest", "graphql"), default="rest")
+    parser.add_argument("--no-record", action="store_true", help="Do not append to the results file")
+    args = parser.parse_args()
+
+    settings = {
+        "latency_ms": args.latency_ms,
+        "llm_chunk_ms": args.llm_chunk_ms,
+        "page_size": args.page_size,
+        "github_rate_limit": args.github_rate_limit,
+        "jobs": args.jobs,
+        "http2": args.http2,
+        "github_backend": args.github_backend,
+    }
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    history = load_results()
+
+    records = []
+    for tickets in args.tickets:
+        record = {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "settings": settings,
+            **run_scale(tickets, args),
+        }
+        baseline = next(
+            (
+                r
+                for r in reversed(history)
+                if r["commit"] != commit and r["tickets"] == tickets and r["settings"] == settings
+            ),
+            None,
+        )
+        print_result(record, baseline)
+        records.append(record)
+
+    if not args.no_record:
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with RESULTS_PATH.open("a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        print(f"Results appended to {RESULTS_PATH}" + (" (uncommitted changes)" if dirty else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Contract frontmatter parsing: the old split("---", 2) + pure-Python
+yaml.safe_load against pcos.frontmatter, cold (libyaml when installed) and
+warm (parse cache hit), over generated contracts with long bodies.
+
+    python benchmarks/bench_frontmatter.py [--contracts 2000] [--body-kb 20]
+"""
+import argparse
+import time
+
+import yaml
+
+from pcos import frontmatter
+from pcos.frontmatter import parse_frontmatter
+
+
+def make_contract(i: int, body_kb: int) -> str:
+    tickets = "".join(
+        f"  - name: Ticket {i}-{t}\n"
+        f"    estimate_slots: {(1, 2, 3, 5, 8)[t % 5]}\n"
+        f"    description: \"Ship part {t} of project {i} (ex: API)\"\n"
+        f"    scope_excluded:\n"
+        f"      - Nothing {t}\n"
+        for t in range(9)
+    )
+    header = (
+        "---\n"
+        f"project: project-{i}\n"
+        f"title: Project {i}\n"
+        "objective: Finish it\n"
+        "definition_of_done: Deployed\n"
+        "deadline: 2026-12-31\n"
+        "excluded_scope:\n  - Mobile\n"
+        f"tickets:\n{tickets}"
+        "---\n"
+    )
+    body = "## 📋 Tickets\n\n" + ("| 1 | Ticket | 3 | Description --- of it |\n" * (body_kb * 24))
+    return header + body
+
+
+def old_parse(text: str) -> dict:
+    _, block, _ = text.split("---", 2)
+    return yaml.safe_load(block)
+
+
+def run(label: str, parse, contracts: list) -> float:
+    t0 = time.perf_counter()
+    for text in contracts:
+        parse(text)
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28}{elapsed * 1000:>10.1f} ms{elapsed / len(contracts) * 1e6:>12.1f} µs/contract")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contracts", type=int, default=2000)
+    parser.add_argument("--body-kb", type=int, default=20)
+    args = parser.parse_args()
+
+    contracts = [make_contract(i, args.body_kb) for i in range(args.contracts)]
+    assert all(old_parse(c) == parse_frontmatter(c) for c in contracts[:10])
+
+    print(f"{len(contracts)} contracts, libyaml: {frontmatter.SafeLoader is not yaml.SafeLoader}")
+    old = run("split + yaml.safe_load", old_parse, contracts)
+
+    frontmatter.PARSE_CACHE_SIZE = 0  # every parse misses
+    cold = run("pcos.frontmatter (cold)", parse_frontmatter, contracts)
+
+    frontmatter.PARSE_CACHE_SIZE = len(contracts)
+    run("pcos.frontmatter (fill)", parse_frontmatter, contracts)
+    warm = run("pcos.frontmatter (warm)", parse_frontmatter, contracts)
+
+    print(f"speedup: {old / cold:.1f}x cold, {old / warm:.1f}x warm")
+
+
+if __name__ == "__main__":
+    main()
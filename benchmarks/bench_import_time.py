@@ -0,0 +1,125 @@
+"""
+Startup cost of the `pcos` CLI, checked against a budget.
+
+Runs `pcos --help` and a `pcos capture` into a throwaway filesystem vault in
+fresh interpreters under `python -X importtime`, reports the import time of
+pcos.cli and of the whole command, and fails if either goes over budget or
+if a heavy client library is imported on those paths.
+
+Each run of a command follows a bare interpreter start, and the command's
+cost is the smallest difference over `--runs` runs: machine load only ever
+adds time, and comes and goes slower than a pair of runs. The budgets leave
+about 40% headroom over the slowest machine state seen for the current code.
+
+    python benchmarks/bench_import_time.py [--runs 10] [--help-budget-ms 400] [--capture-budget-ms 250]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Only the commands that talk to these services may import them.
+HEAVY_MODULES = ("googleapiclient", "google_auth_oauthlib", "requests")
+
+HELP_SNIPPET = "from pcos.cli import app; app(['--help'])"
+CAPTURE_SNIPPET = (
+    "from pcos.cli import app; "
+    "app(['capture', '--project', 'bench', '--input', {input!r}, '--config', {config!r}])"
+)
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Cumulative microseconds per module from `-X importtime` output.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def _run(args: list) -> tuple[float, subprocess.CompletedProcess]:
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], capture_output=True, text=True)
+    elapsed = (time.perf_counter() - t0) * 1000
+
+    if proc.returncode != 0:
+        sys.exit(f"Scenario failed ({proc.returncode}):\n{proc.stdout}{proc.stderr}")
+    return elapsed, proc
+
+
+def run_scenario(snippet: str, runs: int) -> dict:
+    # Wall time without -X importtime, whose own bookkeeping is not free.
+    overheads, baselines = [], []
+    for _ in range(runs):
+        baseline = _run(["-c", "pass"])[0]
+        baselines.append(baseline)
+        overheads.append(_run(["-c", snippet])[0] - baseline)
+
+    _, proc = _run(["-X", "importtime", "-c", snippet])
+    modules = parse_importtime(proc.stderr)
+
+    return {
+        "baseline_ms": statistics.median(baselines),
+        "overhead_ms": min(overheads),
+        "cli_import_ms": modules.get("pcos.cli", 0) / 1000,
+        "heavy": sorted(m for m in modules if m in HEAVY_MODULES),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--help-budget-ms", type=float, default=400)
+    parser.add_argument("--capture-budget-ms", type=float, default=250)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "vault").mkdir()
+        (tmp / "config.yaml").write_text(
+            f"vault_name: bench\n"
+            f"obsidian_api_base: http://127.0.0.1:27123\n"
+            f"vault_path: {tmp / 'vault'}\n"
+            f"projects_root: projects\n"
+        )
+        (tmp / "brainstorm.md").write_text("---\nproject: bench\ntags: [brainstorm]\n---\n- idea\n")
+
+        scenarios = {
+            "help": (HELP_SNIPPET, args.help_budget_ms),
+            "capture": (
+                CAPTURE_SNIPPET.format(
+                    input=str(tmp / "brainstorm.md"), config=str(tmp / "config.yaml")
+                ),
+                args.capture_budget_ms,
+            ),
+        }
+
+        over_budget = False
+        print("command: best time over a bare interpreter start; bare: median start")
+        print(f"{'scenario':<10}{'command (ms)':>14}{'bare (ms)':>11}{'pcos.cli (ms)':>16}{'budget (ms)':>14}")
+        for name, (snippet, budget) in scenarios.items():
+            result = run_scenario(snippet, args.runs)
+            print(
+                f"{name:<10}{result['overhead_ms']:>14.1f}{result['baseline_ms']:>11.1f}"
+                f"{result['cli_import_ms']:>16.1f}{budget:>14.0f}"
+            )
+
+            if result["overhead_ms"] > budget:
+                print(f"  over budget by {result['overhead_ms'] - budget:.1f} ms")
+                over_budget = True
+            if result["heavy"]:
+                print(f"  imports heavy modules: {', '.join(result['heavy'])}")
+                over_budget = True
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Planner benchmark: schedule 10k issues over a multi-year horizon.
+
+    python benchmarks/bench_scheduler.py [--issues 10000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from pcos.scheduler import BusyIndex, plan_smart_schedule
+
+ESTIMATES = [1, 2, 3, 5, 8, 13]
+
+
+def make_inputs(n_issues: int, n_tickets: int = 20):
+    rng = random.Random(42)
+    tickets = [
+        {"name": f"ticket {i} feature", "estimate_slots": rng.choice(ESTIMATES)}
+        for i in range(n_tickets)
+    ]
+    issues = [
+        {"number": i, "title": f"ticket {i % n_tickets} feature"}
+        for i in range(n_issues)
+    ]
+
+    # Roughly one existing meeting per day over three years.
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    busy = []
+    for day in range(3 * 365):
+        start = today + timedelta(days=day, hours=rng.choice([7, 8, 18, 19]))
+        busy.append((start, start + timedelta(minutes=30)))
+
+    return issues, tickets, busy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--issues", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    issues, tickets, busy = make_inputs(args.issues)
+
+    timings = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        schedule = plan_smart_schedule(
+            issues=issues,
+            tickets=tickets,
+            start_date=datetime.now(),
+            work_hours={"start": "09:00", "end": "18:00"},
+            slot_minutes=60,
+            work_days=["MO", "TU", "WE", "TH", "FR"],
+            rest_days_per_week=1,
+            busy=BusyIndex(busy),
+            max_events_per_day=3,
+        )
+        timings.append(time.perf_counter() - t0)
+
+    last = schedule[-1][1] if schedule else None
+    print(f"issues={args.issues} scheduled={len(schedule)} last_slot={last:%Y-%m-%d}")
+    print(f"best={min(timings) * 1000:.1f}ms median={sorted(timings)[len(timings) // 2] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
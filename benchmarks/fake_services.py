@@ -0,0 +1,713 @@
+"""
+Local stand-ins for the HTTP APIs pcos talks to: GitHub (REST and GraphQL),
+Google Calendar, OpenAI chat completions and the Obsidian Local REST API.
+
+Each one implements only the endpoints the pcos clients call, keeps its
+state in memory, and can add latency, paginate and send rate-limit headers
+like the real service, so benchmarks run offline and reproducibly.
+
+    python benchmarks/fake_services.py [--latency-ms 5] [--page-size 100]   # serve until Ctrl-C
+"""
+import argparse
+import email
+import hashlib
+import json
+import re
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlencode, urlsplit
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes: without this, Nagle
+        # and delayed ACKs add ~40 ms to every response.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def _dispatch(self, method: str):
+        service = self.server
+        self.body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        url = urlsplit(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if service.latency:
+            time.sleep(service.latency)
+
+        remaining, reset, allowed = service.take_quota()
+        self.rate_headers = service.rate_headers(remaining, reset)
+        if not allowed:
+            return self.send(*service.rate_limited(reset))
+
+        path = unquote(url.path)
+        for route_method, pattern, name in service.compiled_routes:
+            match = pattern.fullmatch(path)
+            if route_method == method and match:
+                return self.send(*getattr(service, name)(self, **match.groupdict()))
+        self.send(404, {"message": "Not Found"})
+
+    def send(self, status: int, body=None, headers: dict | None = None):
+        headers = {**self.rate_headers, **(headers or {})}
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+            headers.setdefault("Content-Type", "application/json; charset=utf-8")
+        elif isinstance(body, str):
+            body = body.encode()
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+        if body is None or isinstance(body, bytes):
+            body = body or b""
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        # Anything else is an iterator of chunks, streamed as they come.
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in body:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading (e.g. an aborted generation).
+            self.close_connection = True
+
+
+class FakeService(ThreadingHTTPServer):
+    """
+    Base of the stand-ins: a threaded HTTP/1.1 server on a free local port.
+
+    `latency_ms` is added to every request. With `rate_limit`, at most that
+    many requests are served per `rate_window` seconds; the others get the
+    service's rate-limited response.
+    """
+
+    name = "service"
+    routes: list[tuple[str, str, str]] = []  # (method, path regex, method name)
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency_ms: float = 0, rate_limit: int | None = None, rate_window: float = 60):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.compiled_routes = [(m, re.compile(p), n) for m, p, n in self.routes]
+        self.latency = latency_ms / 1000
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.window_start = time.time()
+        self.used = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeService":
+        threading.Thread(target=self.serve_forever, name=self.name, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def take_quota(self) -> tuple[int | None, int, bool]:
+        """
+        Count one request: (remaining quota, window reset epoch, allowed).
+        """
+        with self.lock:
+            self.requests += 1
+            now = time.time()
+            if now - self.window_start >= self.rate_window:
+                self.window_start, self.used = now, 0
+            reset = int(self.window_start + self.rate_window) + 1
+
+            if self.rate_limit is None:
+                return None, reset, True
+            if self.used >= self.rate_limit:
+                return 0, reset, False
+            self.used += 1
+            return self.rate_limit - self.used, reset, True
+
+    def rate_headers(self, remaining: int | None, reset: int) -> dict:
+        return {}
+
+    def rate_limited(self, reset: int) -> tuple:
+        return 429, {"error": {"code": 429, "message": "Rate limit exceeded"}}, {
+            "Retry-After": str(max(1, reset - int(time.time())))
+        }
+
+
+class FakeGitHub(FakeService):
+    """
+    Repos, README contents, issues (paginated, with ETags and `since`) and
+    labels. Sends the X-RateLimit-* headers; over the limit, answers 403
+    with X-RateLimit-Remaining: 0 like the primary rate limit.
+
+    /graphql answers the queries and aliased mutation batches of
+    GitHubGraphQLClient (issue listing, repository and label ids, issue ids
+    by number, createIssue, addLabelsToLabelable), recognised by shape
+    rather than parsed.
+    """
+
+    name = "github"
+    login = "bench"
+    repo = r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)"
+    routes = [
+        ("GET", r"/user", "get_user"),
+        ("POST", r"/user/repos", "create_repo"),
+        ("GET", repo, "get_repo"),
+        ("GET", repo + r"/contents/(?P<path>.+)", "get_contents"),
+        ("PUT", repo + r"/contents/(?P<path>.+)", "put_contents"),
+        ("GET", repo + r"/issues", "list_issues"),
+        ("POST", repo + r"/issues", "create_issue"),
+        ("POST", repo + r"/issues/(?P<number>\d+)/labels", "add_labels"),
+        ("POST", repo + r"/labels", "create_label"),
+        ("POST", r"/graphql", "graphql"),
+    ]
+
+    def __init__(self, page_size: int = 100, rate_limit: int | None = 5000, rate_window: float = 3600, **kwargs):
+        super().__init__(rate_limit=rate_limit, rate_window=rate_window, **kwargs)
+        self.page_size = page_size
+        self.repos: dict[str, dict] = {}
+
+    def rate_headers(self, remaining, reset):
+        if remaining is None:
+            return {}
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(reset),
+            "X-RateLimit-Used": str(self.rate_limit - remaining),
+        }
+
+    def rate_limited(self, reset):
+        return 403, {"message": "API rate limit exceeded"}, self.rate_headers(0, reset)
+
+    def _repo(self, owner: str, repo: str) -> dict | None:
+        return self.repos.get(f"{owner}/{repo}")
+
+    def get_user(self, req):
+        return 200, {"login": self.login}
+
+    def create_repo(self, req):
+        name = json.loads(req.body)["name"]
+        with self.lock:
+            if f"{self.login}/{name}" in self.repos:
+                return 422, {"message": "Repository creation failed."}
+            self.repos[f"{self.login}/{name}"] = {"files": {}, "issues": [], "labels": set()}
+        return 201, {"name": name, "full_name": f"{self.login}/{name}"}
+
+    def get_repo(self, req, owner, repo):
+        if self._repo(owner, repo) is None:
+            return 404, {"message": "Not Found"}
+        return 200, {"name": repo, "full_name": f"{owner}/{repo}"}
+
+    def get_contents(self, req, owner, repo, path):
+        data = self._repo(owner, repo)
+        if data is None or path not in data["files"]:
+            return 404, {"message": "Not Found"}
+        return 200, {"path": path, "sha": data["files"][path]}
+
+    def put_contents(self, req, owner, repo, path):
+        import base64
+
+        data = self._repo(owner, repo)
+        if data is None:
+            return 404, {"message": "Not Found"}
+        raw = base64.b64decode(json.loads(req.body)["content"])
+        sha = hashlib.sha1(b"blob %d\0" % len(raw) + raw).hexdigest()
+        with self.lock:
+            created = path not in data["files"]
+            data["files"][path] = sha
+        return (201 if created else 200), {"content": {"path": path, "sha": sha}}
+
+    def list_issues(self, req, owner, repo):
+        data = self._repo(owner, repo)
+        if data is None:
+            return 404, {"message": "Not Found"}
+
+        state = req.query.get("state", "open")
+        since = req.query.get("since")
+        per_page = min(int(req.query.get("per_page", 30)), self.page_size)
+        page = int(req.query.get("page", 1))
+
+        with self.lock:
+            issues = [
+                dict(i, labels=list(i["labels"]))
+                for i in reversed(data["issues"])
+                if (state == "all" or i["state"] == state)
+                and (since is None or i["updated_at"] >= since)
+            ]
+
+        last = max(1, -(-len(issues) // per_page))
+        body = json.dumps(issues[(page - 1) * per_page : page * per_page]).encode()
+        etag = f'W/"{hashlib.md5(body).hexdigest()}"'
+        headers = {"ETag": etag, "Content-Type": "application/json; charset=utf-8"}
+
+        def link(n: int) -> str:
+            return f"{self.url}/repos/{owner}/{repo}/issues?{urlencode({**req.query, 'page': n})}"
+
+        links = []
+        if page < last:
+            links += [f'<{link(page + 1)}>; rel="next"', f'<{link(last)}>; rel="last"']
+        if page > 1:
+            links += [f'<{link(page - 1)}>; rel="prev"', f'<{link(1)}>; rel="first"']
+        if links:
+            headers["Link"] = ", ".join(links)
+
+        if req.headers.get("If-None-Match") == etag:
+            return 304, None, headers
+        return 200, body, headers
+
+    def _new_issue(self, owner: str, repo: str, title: str, body: str) -> dict:
+        data = self._repo(owner, repo)
+        now = _iso(datetime.now(timezone.utc))
+        with self.lock:
+            number = len(data["issues"]) + 1
+            issue = {
+                "number": number,
+                "title": title,
+                "body": body,
+                "state": "open",
+                "labels": [],
+                "html_url": f"https://github.com/{owner}/{repo}/issues/{number}",
+                "created_at": now,
+                "updated_at": now,
+            }
+            data["issues"].append(issue)
+        return issue
+
+    def _label_issue(self, issue: dict, names: list) -> list:
+        with self.lock:
+            for label in names:
+                if label not in [l["name"] for l in issue["labels"]]:
+                    issue["labels"].append({"name": label})
+            issue["updated_at"] = _iso(datetime.now(timezone.utc))
+            return list(issue["labels"])
+
+    def _issue(self, owner: str, repo: str, number: int) -> dict | None:
+        data = self._repo(owner, repo)
+        if data is None or not 0 < number <= len(data["issues"]):
+            return None
+        return data["issues"][number - 1]
+
+    def create_issue(self, req, owner, repo):
+        if self._repo(owner, repo) is None:
+            return 404, {"message": "Not Found"}
+        payload = json.loads(req.body)
+        return 201, self._new_issue(owner, repo, payload["title"], payload.get("body", ""))
+
+    def add_labels(self, req, owner, repo, number):
+        issue = self._issue(owner, repo, int(number))
+        if issue is None:
+            return 404, {"message": "Not Found"}
+        return 200, self._label_issue(issue, json.loads(req.body)["labels"])
+
+    def create_label(self, req, owner, repo):
+        data = self._repo(owner, repo)
+        if data is None:
+            return 404, {"message": "Not Found"}
+        name = json.loads(req.body)["name"]
+        with self.lock:
+            data["labels"].add(name)
+        return 201, {"name": name, "node_id": f"L_{owner}/{repo}:{name}"}
+
+    # ---------- GraphQL ----------
+
+    def graphql(self, req):
+        payload = json.loads(req.body)
+        query, variables = payload["query"], payload.get("variables") or {}
+
+        if "issues(first:" in query:
+            return 200, {"data": {"repository": self._gql_issues(**variables)}}
+        if "label(name: $label)" in query:
+            return 200, {"data": {"repository": self._gql_repo(**variables)}}
+
+        data, errors = {}, []
+        for alias, result in self._gql_fields(query, variables):
+            if result is None:
+                errors.append({"path": [alias], "message": "Could not resolve to a node"})
+            data[alias] = result
+        return 200, {"data": data, **({"errors": errors} if errors else {})}
+
+    def _gql_issues(self, owner, name, cursor=None, states=None, since=None):
+        data = self._repo(owner, name)
+        if data is None:
+            return None
+        offset = int(cursor or 0)
+        with self.lock:
+            issues = [
+                i
+                for i in data["issues"]
+                if (not states or i["state"].upper() in states)
+                and (since is None or i["updated_at"] >= since)
+            ]
+            page = [
+                {
+                    "id": f"I_{owner}/{name}#{i['number']}",
+                    "number": i["number"],
+                    "title": i["title"],
+                    "state": i["state"].upper(),
+                    "url": i["html_url"],
+                    "labels": {"nodes": list(i["labels"])},
+                }
+                for i in issues[offset : offset + self.page_size]
+            ]
+        end = offset + len(page)
+        return {
+            "issues": {
+                "pageInfo": {"hasNextPage": end < len(issues), "endCursor": str(end)},
+                "nodes": page,
+            }
+        }
+
+    def _gql_repo(self, owner, name, label=""):
+        data = self._repo(owner, name)
+        if data is None:
+            return None
+        found = label in data["labels"]
+        return {
+            "id": f"R_{owner}/{name}",
+            "label": {"id": f"L_{owner}/{name}:{label}"} if found else None,
+        }
+
+    GQL_CREATE_ISSUE = re.compile(
+        r'(\w+): createIssue\(input: \{repositoryId: "R_([^/"]+)/([^"]+)", title: \$(\w+), body: \$(\w+)\}\)'
+    )
+    GQL_ADD_LABELS = re.compile(
+        r"(\w+): addLabelsToLabelable\(input: \{labelableId: \$(\w+), labelIds: \[([^\]]*)\]\}\)"
+    )
+    GQL_ISSUE_ID = re.compile(
+        r'(\w+): repository\(owner: ("[^"]*"), name: ("[^"]*")\) \{ issue\(number: (\d+)\) \{ id \} \}'
+    )
+    GQL_NODE_ID = re.compile(r"I_([^/]+)/(.+)#(\d+)")
+
+    def _gql_fields(self, query: str, variables: dict):
+        """
+        (alias, result) of each aliased field of a GitHubGraphQLClient
+        batch, in query order; None when its target does not exist.
+        """
+        fields = []
+        for m in self.GQL_CREATE_ISSUE.finditer(query):
+            alias, owner, repo, title, body = m.groups()
+            if self._repo(owner, repo) is None:
+                fields.append((m.start(), alias, None))
+                continue
+            issue = self._new_issue(owner, repo, variables[title], variables.get(body) or "")
+            node = {"id": f"I_{owner}/{repo}#{issue['number']}", "number": issue["number"]}
+            fields.append((m.start(), alias, {"issue": node}))
+
+        for m in self.GQL_ADD_LABELS.finditer(query):
+            alias, var, label_ids = m.groups()
+            node = self.GQL_NODE_ID.fullmatch(variables[var])
+            issue = node and self._issue(node[1], node[2], int(node[3]))
+            if not issue:
+                fields.append((m.start(), alias, None))
+                continue
+            names = [l.rsplit(":", 1)[1] for l in json.loads(f"[{label_ids}]")]
+            self._label_issue(issue, names)
+            fields.append((m.start(), alias, {"clientMutationId": None}))
+
+        for m in self.GQL_ISSUE_ID.finditer(query):
+            alias, owner, repo, number = m.groups()
+            owner, repo = json.loads(owner), json.loads(repo)
+            if self._repo(owner, repo) is None:
+                fields.append((m.start(), alias, None))
+                continue
+            issue = self._issue(owner, repo, int(number))
+            found = {"id": f"I_{owner}/{repo}#{number}"} if issue else None
+            fields.append((m.start(), alias, {"issue": found}))
+
+        return [(alias, result) for _, alias, result in sorted(fields, key=lambda f: f[0])]
+
+
+class FakeOpenAI(FakeService):
+    """
+    Chat completions that turn a pcos brainstorm into a valid contract: the
+    `project:` line of the brainstorm names the project and every `- [ ]`
+    item becomes a ticket. Streams it in `chunk_chars` pieces, `chunk_ms`
+    apart, when asked to. Sends x-ratelimit-* headers and, over the
+    limit, a 429 with retry-after-ms.
+    """
+
+    name = "openai"
+    routes = [("POST", r"/v1/chat/completions", "complete")]
+
+    def __init__(self, chunk_chars: int = 40, chunk_ms: float = 1, **kwargs):
+        super().__init__(**kwargs)
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_ms / 1000
+
+    def rate_headers(self, remaining, reset):
+        if remaining is None:
+            return {}
+        return {
+            "x-ratelimit-limit-requests": str(self.rate_limit),
+            "x-ratelimit-remaining-requests": str(remaining),
+            "x-ratelimit-reset-requests": f"{max(0, reset - time.time()):.0f}s",
+        }
+
+    def rate_limited(self, reset):
+        return 429, {"error": {"message": "Rate limit reached", "type": "requests"}}, {
+            "retry-after-ms": str(max(0, int((reset - time.time()) * 1000))),
+            **self.rate_headers(0, reset),
+        }
+
+    @staticmethod
+    def contract_for(prompt: str) -> str:
+        brainstorm = prompt.rsplit("==================", 1)[-1]
+        match = re.search(r"^project:\s*(\S+)", brainstorm, re.MULTILINE)
+        project = match.group(1) if match else "project"
+        items = re.findall(r"^- \[ \] (.+)$", brainstorm, re.MULTILINE) or ["Ship it"]
+
+        tickets = [
+            {
+                "name": item.strip(),
+                "estimate_slots": (1, 2, 3, 5)[i % 4],
+                "description": f"Deliver '{item.strip()}' with tests",
+                "scope_excluded": ["Anything not listed"],
+            }
+            for i, item in enumerate(items[:9])
+        ]
+        header = json.dumps(
+            {
+                "project": project,
+                "title": project.replace("-", " ").title(),
+                "objective": f"Close {project}",
+                "definition_of_done": "Every ticket shipped",
+                "deadline": "2030-12-31",
+                "excluded_scope": ["Mobile app"],
+                "tickets": tickets,
+            },
+            indent=2,
+        )  # JSON is valid YAML
+        rows = "".join(
+            f"| {i} | {t['name']} | {t['estimate_slots']} | {t['description']} |\n"
+            for i, t in enumerate(tickets, 1)
+        )
+        details = "".join(
+            f"#### {i}. {t['name']}\n\n**Estimation:** {t['estimate_slots']} slots\n\n"
+            f"**Description:** {t['description']}\n\n**Scope exclu:**\n- Anything not listed\n\n"
+            for i, t in enumerate(tickets, 1)
+        )
+        return (
+            f"---\n{header}\n---\n\n## 📋 Tickets\n\n"
+            "| # | Ticket | Estimation | Description |\n|---|--------|------------|-------------|\n"
+            f"{rows}\n### Détails des tickets\n\n{details}"
+        )
+
+    def _events(self, text: str):
+        for i in range(0, len(text), self.chunk_chars):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            delta = {"choices": [{"index": 0, "delta": {"content": text[i : i + self.chunk_chars]}}]}
+            yield f"data: {json.dumps(delta)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    def complete(self, req):
+        payload = json.loads(req.body)
+        text = self.contract_for(payload["messages"][-1]["content"])
+
+        if payload.get("stream"):
+            return 200, self._events(text), {"Content-Type": "text/event-stream"}
+
+        return 200, {
+            "object": "chat.completion",
+            "model": payload.get("model"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+            ],
+        }
+
+
+class FakeObsidian(FakeService):
+    """
+    The Local REST API vault endpoints: notes (with ETag/Last-Modified and
+    304s) and directory listings.
+    """
+
+    name = "obsidian"
+    routes = [
+        ("GET", r"/vault/[^/]+/(?P<path>.*)", "get"),
+        ("PUT", r"/vault/[^/]+/(?P<path>.*)", "put"),
+    ]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.notes: dict[str, tuple[bytes, float]] = {}
+
+    def get(self, req, path):
+        if path == "" or path.endswith("/"):
+            with self.lock:
+                entries = {
+                    rest.partition("/")[0] + ("/" if "/" in rest else "")
+                    for p in self.notes
+                    if p.startswith(path) and (rest := p[len(path):])
+                }
+            if not entries:
+                return 404, {"errorCode": 40400, "message": "Not Found"}
+            return 200, {"files": sorted(entries)}
+
+        note = self.notes.get(path)
+        if note is None:
+            return 404, {"errorCode": 40400, "message": "File does not exist"}
+        content, mtime = note
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+        headers = {
+            "Content-Type": "text/markdown; charset=utf-8",
+            "ETag": etag,
+            "Last-Modified": formatdate(mtime, usegmt=True),
+        }
+        if req.headers.get("If-None-Match") == etag:
+            return 304, None, headers
+        return 200, content, headers
+
+    def put(self, req, path):
+        with self.lock:
+            self.notes[path] = (req.body, time.time())
+        return 204, None
+
+
+class FakeCalendar(FakeService):
+    """
+    freeBusy (`busy_per_day` one-hour meetings every day from 10:00 UTC) and
+    event inserts, one by one or through the multipart batch endpoint.
+    """
+
+    name = "calendar"
+    events_path = r"/calendar/v3/calendars/(?P<calendar>[^/]+)/events"
+    routes = [
+        ("POST", r"/calendar/v3/freeBusy", "freebusy"),
+        ("POST", events_path, "insert"),
+        ("POST", r"/batch/calendar/v3", "batch"),
+    ]
+
+    def __init__(self, busy_per_day: int = 2, **kwargs):
+        super().__init__(**kwargs)
+        self.busy_per_day = busy_per_day
+        self.events: list[dict] = []
+
+    def freebusy(self, req):
+        query = json.loads(req.body)
+        start = datetime.fromisoformat(query["timeMin"].replace("Z", "+00:00"))
+        end = datetime.fromisoformat(query["timeMax"].replace("Z", "+00:00"))
+
+        busy = []
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end:
+            for k in range(self.busy_per_day):
+                begin = day + timedelta(hours=10 + 2 * k)
+                busy.append({"start": _iso(begin), "end": _iso(begin + timedelta(hours=1))})
+            day += timedelta(days=1)
+
+        return 200, {
+            "kind": "calendar#freeBusy",
+            "timeMin": query["timeMin"],
+            "timeMax": query["timeMax"],
+            "calendars": {item["id"]: {"busy": busy} for item in query.get("items", [])},
+        }
+
+    def insert(self, req, calendar):
+        return self._insert(json.loads(req.body))
+
+    def _insert(self, event: dict) -> tuple:
+        with self.lock:
+            event = {**event, "id": f"evt{len(self.events) + 1}", "status": "confirmed"}
+            self.events.append(event)
+        return 200, event
+
+    def batch(self, req):
+        content_type = req.headers["Content-Type"]
+        message = email.message_from_bytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + req.body
+        )
+        boundary = f"batch_{time.perf_counter_ns()}"
+
+        parts = []
+        for part in message.get_payload():
+            head, _, body = re.split(r"(\r?\n\r?\n)", part.get_payload(), maxsplit=1)
+            method, target, _ = head.split(None, 2)
+            if method == "POST" and re.fullmatch(self.events_path, unquote(urlsplit(target).path)):
+                status, response = self._insert(json.loads(body))
+            else:
+                status, response = 404, {"error": {"code": 404, "message": "Not Found"}}
+
+            content_id = part["Content-ID"].strip("<>")
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(response)}\r\n"
+            )
+
+        body = "".join(parts) + f"--{boundary}--\r\n"
+        return 200, body, {"Content-Type": f"multipart/mixed; boundary={boundary}"}
+
+
+def start_services(
+    latency_ms: float = 0,
+    page_size: int = 100,
+    github_rate_limit: int | None = 5000,
+    llm_chunk_ms: float = 1,
+) -> dict[str, FakeService]:
+    """
+    Start one of each stand-in; returns them by name.
+    """
+    services = [
+        FakeGitHub(latency_ms=latency_ms, page_size=page_size, rate_limit=github_rate_limit),
+        FakeOpenAI(latency_ms=latency_ms, chunk_ms=llm_chunk_ms),
+        FakeObsidian(latency_ms=latency_ms),
+        FakeCalendar(latency_ms=latency_ms),
+    ]
+    return {s.name: s.start() for s in services}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--github-rate-limit", type=int, default=5000)
+    parser.add_argument("--llm-chunk-ms", type=float, default=1)
+    args = parser.parse_args()
+
+    services = start_services(args.latency_ms, args.page_size, args.github_rate_limit, args.llm_chunk_ms)
+    for name, service in services.items():
+        print(f"{name:<10}{service.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for service in services.values():
+            service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,48 @@
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+import json
 import warnings
 
 warnings.filterwarnings("ignore", category=FutureWarning, module="google.api_core")
 
 
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import build_http
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.oauth2.credentials import Credentials
 
+from pcos.tracing import instrument_http, span, traced
+from pcos.transport import MAX_RETRIES, SERVICE_TIMEOUTS
+
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
+BATCH_SIZE = 50  # Calendar API batch limit
 
 
 class CalendarClient:
-    def __init__(self, credentials_path: Path):
+    def __init__(
+        self,
+        credentials_path: Path,
+        api_root: str | None = None,
+        timeout: tuple[float, float] = SERVICE_TIMEOUTS["calendar"],
+        retries: int = MAX_RETRIES,
+    ):
+        """
+        `api_root` (e.g. "http://127.0.0.1:8080/") sends every request,
+        batches included, to a Calendar API-compatible server instead of
+        https://www.googleapis.com/.
+
+        httplib2 has a single socket timeout: the larger of (connect, read)
+        is used. Read-only calls are retried up to `retries` times by
+        googleapiclient (429/5xx and connection errors, jittered backoff);
+        inserts are not, as a retried insert may book the event twice.
+        """
+        self.retries = retries
+        with span("calendar.auth"):
+            self._connect(credentials_path, api_root, max(timeout))
+
+    def _connect(self, credentials_path: Path, api_root: str | None, timeout: float):
         token_path = credentials_path.parent / "token.json"
         
         creds = None
@@ -40,16 +69,70 @@ class CalendarClient:
             token_path.write_text(creds.to_json())
             print("✓ Authentication successful, token saved")
 
-        self.service = build("calendar", "v3", credentials=creds)
+        # What build(credentials=...) does, keeping a handle on the transport.
+        base = build_http()
+        base.timeout = timeout
+        http = AuthorizedHttp(creds, http=base)
+        instrument_http(http, "calendar")
+        if api_root is None:
+            self.service = build("calendar", "v3", http=http)
+            return
 
-    def create_event(
+        # client_options.api_endpoint would leave the batch URI, which is
+        # derived from the discovery document's rootUrl, pointing at Google.
+        doc = json.loads(get_static_doc("calendar", "v3"))
+        doc["rootUrl"] = api_root.rstrip("/") + "/"
+        doc["baseUrl"] = doc["rootUrl"] + doc["servicePath"]
+        self.service = build_from_document(doc, http=http)
+
+    @traced("calendar.busy_intervals")
+    def busy_intervals(
         self,
         calendar_id: str,
+        time_min: datetime,
+        time_max: datetime,
+    ) -> list[tuple[datetime, datetime]]:
+        """
+        Busy (start, end) pairs of a calendar over [time_min, time_max), read
+        with a single freebusy query. Datetimes are naive UTC, the same
+        convention the planner and create_event use.
+        """
+
+        def to_utc(dt: datetime) -> str:
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return dt.astimezone(timezone.utc).isoformat()
+
+        def from_utc(value: str) -> datetime:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+        response = (
+            self.service.freebusy()
+            .query(
+                body={
+                    "timeMin": to_utc(time_min),
+                    "timeMax": to_utc(time_max),
+                    "items": [{"id": calendar_id}],
+                }
+            )
+            .execute(num_retries=self.retries)
+        )
+
+        calendar = response.get("calendars", {}).get(calendar_id, {})
+        if calendar.get("errors"):
+            reasons = ", ".join(e.get("reason", "unknown") for e in calendar["errors"])
+            raise RuntimeError(f"Free/busy query failed for {calendar_id}: {reasons}")
+
+        return [(from_utc(b["start"]), from_utc(b["end"])) for b in calendar.get("busy", [])]
+
+    @staticmethod
+    def _event_body(
         title: str,
         description: str,
         start: datetime,
         duration_minutes: int,
-    ):
+    ) -> dict:
         end = start + timedelta(minutes=duration_minutes)
 
         if start.tzinfo is None:
@@ -57,15 +140,60 @@ class CalendarClient:
         if end.tzinfo is None:
             end = end.replace(tzinfo=timezone.utc)
 
-        event = {
+        return {
             "summary": title,
             "description": description,
             "start": {"dateTime": start.isoformat(), "timeZone": str(start.tzinfo)},
             "end": {"dateTime": end.isoformat(), "timeZone": str(end.tzinfo)},
         }
 
+    def create_event(
+        self,
+        calendar_id: str,
+        title: str,
+        description: str,
+        start: datetime,
+        duration_minutes: int,
+    ):
+        event = self._event_body(title, description, start, duration_minutes)
+
         return (
             self.service.events()
             .insert(calendarId=calendar_id, body=event)
             .execute()
-        )
\ No newline at end of file
+        )
+
+    @traced("calendar.create_events")
+    def create_events(self, calendar_id: str, events: list[dict]) -> list[tuple]:
+        """
+        Insert many events through the batch endpoint, BATCH_SIZE per request.
+
+        `events` are dicts with the create_event keyword arguments (title,
+        description, start, duration_minutes). Returns one (event, error)
+        tuple per input, in input order. A batch request that fails as a
+        whole marks each of its events with that error; the other batches
+        are still sent.
+        """
+        results: list[tuple] = [(None, None)] * len(events)
+
+        def on_response(request_id, response, exception):
+            results[int(request_id)] = (response, exception)
+
+        for offset in range(0, len(events), BATCH_SIZE):
+            chunk = range(offset, min(offset + BATCH_SIZE, len(events)))
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for i in chunk:
+                batch.add(
+                    self.service.events().insert(
+                        calendarId=calendar_id, body=self._event_body(**events[i])
+                    ),
+                    request_id=str(i),
+                )
+            try:
+                batch.execute()
+            except Exception as e:
+                for i in chunk:
+                    if results[i] == (None, None):
+                        results[i] = (None, e)
+
+        return results
@@ -1,56 +1,97 @@
 from pathlib import Path
+from typing import Optional, Set
+import sys
+
 import typer
 from rich import print
 
-from pcos.config import load_config, ConfigError
-from pcos.parser import load_contract, ContractError
-
-from pcos.obsidian import ObsidianClient, ObsidianError
-from pcos.parser import read_input_text
-from pcos.config import get_env
-
-from typing import Optional, Set
-
-from pcos.clipboard_watcher import (
-    watch_clipboard,
+from pcos.defaults import (
     DEFAULT_ALLOWED_TAGS,
-    DEFAULT_DEBOUNCE_SECONDS,
+    DEFAULT_BACKEND,
     DEFAULT_CHECK_INTERVAL,
+    DEFAULT_DEBOUNCE_SECONDS,
+    DEFAULT_WORKERS,
 )
 
-from pcos.contract_generator import generate_contract
+# Commands import what they use inside their body: `pcos capture` (run for
+# every watcher capture) must not pay for the Google and GitHub clients.
 
-from pcos.contracts import load_project_contract
-from pcos.github import GitHubClient
-from pcos.renderers import render_readme
-from pcos.issues import sync_issues
+app = typer.Typer()
 
-from datetime import datetime
-from pathlib import Path
 
-from pcos.calendar import CalendarClient
-from pcos.scheduler import plan_smart_schedule
-from pcos.contracts import load_project_contract
-from pcos.github import GitHubClient
+@app.callback()
+def main(
+    ctx: typer.Context,
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Time each phase and HTTP endpoint, print a summary and write a trace",
+    ),
+    trace_file: Path = typer.Option(
+        Path("pcos-trace.json"),
+        help="Chrome trace (JSON) written with --profile",
+    ),
+):
+    """
+    Project Closure OS: brainstorm -> contract -> GitHub -> calendar.
+    """
+    if not profile:
+        return
 
-app = typer.Typer()
+    from pcos import tracing
+
+    tracer = tracing.enable()
+
+    def finish():
+        tracing.disable()
+        tracer.print_summary()
+        tracer.write_chrome_trace(trace_file)
+        print(f"[dim]Trace written to {trace_file} (open in ui.perfetto.dev)[/dim]", file=sys.stderr)
+
+    # Close callbacks run last-in first-out: the command span ends first.
+    ctx.call_on_close(finish)
+    ctx.with_resource(tracer.span(f"pcos {ctx.invoked_subcommand}"))
 
 
 @app.command()
 def validate(
-    contract: Path = typer.Argument(..., exists=True),
+    contract: Optional[Path] = typer.Argument(None, exists=True),
     config: Path = typer.Option("config.yaml"),
+    all_projects: bool = typer.Option(
+        False,
+        "--all",
+        help="Validate every project contract under projects_root",
+    ),
+    report: Optional[Path] = typer.Option(
+        None,
+        help="With --all, write a JSONL report here ('-' for stdout)",
+    ),
+    jobs: Optional[int] = typer.Option(None, help="Validation processes with --all (default: CPU count)"),
 ):
     """
     Validate configuration and contract file.
     """
+    from pcos.config import load_config, ConfigError
+    from pcos.parser import load_contract, ContractError
+
+    if not contract and not all_projects:
+        print("[red]Give a contract file or --all[/red]")
+        raise typer.Exit(1)
+
+    # Keep stdout machine-readable when the report goes there.
+    out = sys.stderr if report == Path("-") else None
+
     try:
         cfg = load_config(config)
-        print("[green]✓ Config loaded[/green]")
+        print("[green]✓ Config loaded[/green]", file=out)
     except ConfigError as e:
         print(f"[red]Config error:[/red] {e}")
         raise typer.Exit(1)
 
+    if all_projects:
+        _validate_all(cfg, report, jobs, out)
+        return
+
     try:
         contract_data = load_contract(contract)
         print("[green]✓ Contract loaded[/green]")
@@ -63,6 +104,41 @@ def validate(
     print(f"Deadline: {contract_data['deadline']}")
     print(f"Tickets: {len(contract_data['tickets'])}")
 
+
+def _validate_all(cfg: dict, report: Optional[Path], jobs: Optional[int], out=None):
+    import json
+    import time
+
+    from rich.markup import escape
+
+    from pcos.contracts import validate_projects
+
+    started = time.perf_counter()
+    rows = validate_projects(cfg, jobs)
+    elapsed = time.perf_counter() - started
+
+    if report:
+        lines = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        if report == Path("-"):
+            sys.stdout.write(lines)
+        else:
+            report.write_text(lines, encoding="utf-8")
+
+    invalid = [row for row in rows if not row["valid"]]
+    for row in invalid:
+        print(f"❌ {escape(row['project'])}", file=out)
+        for error in row["errors"]:
+            print(f"   - {escape(error)}", file=out)
+
+    print(
+        f"{'❌' if invalid else '✅'} {len(rows) - len(invalid)}/{len(rows)} contracts valid "
+        f"({elapsed:.2f}s)",
+        file=out,
+    )
+    if invalid:
+        raise typer.Exit(1)
+
+
 @app.command()
 def capture(
     project: str = typer.Option(..., help="Project name"),
@@ -72,6 +148,11 @@ def capture(
     """
     Capture markdown into Obsidian as 00_brainstorm.md
     """
+    from pcos.config import load_config, ConfigError
+    from pcos.contracts import brainstorm_path
+    from pcos.obsidian import make_obsidian_client, ObsidianError
+    from pcos.parser import read_input_text
+
     try:
         cfg = load_config(Path(config))
         print("[green]✓ Config loaded[/green]")
@@ -88,13 +169,9 @@ def capture(
         raise typer.Exit(1)
 
     try:
-        client = ObsidianClient(
-            base_url=cfg["obsidian_api_base"],
-            vault_name=cfg["vault_name"],
-            api_key=get_env("OBSIDIAN_API_KEY"),
-        )
+        client = make_obsidian_client(cfg)
 
-        note_path = f"{cfg['projects_root']}/{project}/00_brainstorm.md"
+        note_path = brainstorm_path(cfg, project)
         client.write_note(note_path, text)
 
         print(f"[green]✓ Brainstorm captured[/green]")
@@ -122,10 +199,23 @@ def watch(
         DEFAULT_CHECK_INTERVAL,
         help="Clipboard polling interval in seconds",
     ),
+    backend: str = typer.Option(
+        DEFAULT_BACKEND,
+        help="Clipboard backend: auto, powershell, wl-paste, x11 or poll",
+    ),
+    config: Path = typer.Option("config.yaml"),
 ):
     """
     Watch clipboard and automatically capture brainstorm markdown into Obsidian.
     """
+    from pcos.config import load_config, ConfigError
+    from pcos.clipboard_watcher import watch_clipboard
+
+    try:
+        cfg = load_config(Path(config))
+    except ConfigError as e:
+        print(f"[red]Config error:[/red] {e}")
+        raise typer.Exit(1)
 
     tag_set: Set[str] = {
         tag.strip().lower()
@@ -138,19 +228,43 @@ def watch(
         raise typer.Exit(1)
 
     watch_clipboard(
+        cfg=cfg,
         project=project,
         allowed_tags=tag_set,
         debounce_seconds=debounce,
         check_interval=interval,
+        backend=backend,
     )
 
 @app.command()
-def contract(project: str):
+def contract(
+    project: Optional[str] = typer.Argument(None),
+    all_projects: bool = typer.Option(
+        False,
+        "--all",
+        help="Generate every missing or stale contract under projects_root",
+    ),
+    jobs: int = typer.Option(DEFAULT_WORKERS, help="Contracts generated concurrently with --all"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Neither read nor store cached LLM responses"),
+    refresh: bool = typer.Option(False, "--refresh", help="Call the LLM even if a cached response exists"),
+):
     """
     Generate project contract from brainstorm using LLM.
     """
+    import asyncio
+
+    from rich.markup import escape
 
-    from pathlib import Path
+    from pcos.config import load_config, ConfigError
+    from pcos.contract_generator import generate_contract, generate_contracts, stale_projects
+    from pcos.contracts import brainstorm_path
+    from pcos.llm import CACHE_MAX_BYTES, ResponseCache, sha256_text
+    from pcos.obsidian import make_obsidian_client
+    from pcos.state import StateStore
+
+    if not project and not all_projects:
+        print("[red]Give a project name or --all[/red]")
+        raise typer.Exit(1)
 
     try:
         cfg = load_config(Path("config.yaml"))
@@ -159,21 +273,182 @@ def contract(project: str):
         print(f"[red]Config error:[/red] {e}")
         raise typer.Exit(1)
 
-    try:
-        path = generate_contract(cfg, project)
-        print(f"[green]✓ Contract generated[/green]")
-        print(f"[dim]{path}[/dim]")
-    except Exception as e:
-        print(f"[red]Error:[/red] {e}")
+    cache = None
+    if not no_cache:
+        max_mb = cfg.get("llm", {}).get("cache_max_mb")
+        cache = ResponseCache(
+            max_bytes=CACHE_MAX_BYTES if max_mb is None else int(max_mb * 1024 * 1024)
+        )
+    store = StateStore()
+
+    if not all_projects:
+        try:
+            path, cached = generate_contract(cfg, project, cache=cache, refresh=refresh)
+            brainstorm = make_obsidian_client(cfg).read_note(brainstorm_path(cfg, project))
+            store.record_brainstorm(project, sha256_text(brainstorm))
+            if cached:
+                print("[green]✓ Brainstorm unchanged, reused cached LLM response[/green]")
+            print(f"[green]✓ Contract generated[/green]")
+            print(f"[dim]{path}[/dim]")
+        except Exception as e:
+            print(f"[red]Error:[/red] {e}")
+            raise typer.Exit(1)
+
+        print(f"📄 Contract generated: {path}")
+        return
+
+    projects = asyncio.run(stale_projects(cfg, store, jobs))
+    if not projects:
+        print("✅ Every contract is up to date")
+        return
+    print(f"✓ Generating {len(projects)} contracts")
+
+    done = 0
+
+    def on_result(name: str, cached: bool, error: Exception | None):
+        nonlocal done
+        done += 1
+        prefix = f"[{done}/{len(projects)}]"
+        if error:
+            print(f"{escape(prefix)} ❌ {name}: {escape(str(error))}")
+        else:
+            print(f"{escape(prefix)} ✓ {name}" + (" (cached)" if cached else ""))
+
+    results = asyncio.run(
+        generate_contracts(
+            cfg, projects, store, jobs=jobs, cache=cache, refresh=refresh, on_result=on_result
+        )
+    )
+
+    failed = [name for name, error in results.items() if error]
+    if failed:
+        print(f"[red]{len(failed)} contract(s) failed:[/red] {escape(', '.join(sorted(failed)))}")
         raise typer.Exit(1)
+    print("✅ Contracts done")
+
+def _publish_project(cfg: dict, gh, store, owner: str, project: str, workers: int, log=print) -> dict:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from pcos.contracts import load_project_contract
+    from pcos.issues import sync_issues
+    from pcos.matcher import TicketMatcher
+    from pcos.renderers import render_readme
+    from pcos.state import refresh_issues
+    from pcos.tracing import span
+
+    log("✓ Loading contract")
+    with span("publish.load_contract", project=project):
+        contract = load_project_contract(cfg, project)
+
+    repo_name = project.lower().replace(" ", "-")
+    repo_key = f"{owner}/{repo_name}"
+    summary = {"project": project, "repo": repo_key}
+
+    log("✓ Resolving repo")
+    with span("publish.resolve_repo", project=project):
+        repo = gh.get_repo(owner, repo_name)
+        if not repo:
+            log(f"📦 Creating repo {repo_key}")
+            gh.create_repo(repo_name, private=False)
+            summary["repo_status"] = "created"
+            # Whatever was recorded belonged to a previous repo of that name.
+            store.forget_repo(repo_key)
+        else:
+            log(f"📦 Repo exists {repo_key}")
+            summary["repo_status"] = "exists"
+
+    if not store.record_contract(project, contract):
+        log("✓ Contract unchanged since last publish")
+
+    log("✓ Sync README + issues")
+    readme = render_readme(contract)
+    tickets = contract.get("tickets", [])
+    matcher = TicketMatcher(tickets)
+    with span("publish.refresh_issues", project=project):
+        existing = refresh_issues(store, gh, owner, repo_name)
+
+    # A new repo has no README yet, whatever SHA was stored for its name.
+    known_sha = None if summary["repo_status"] == "created" else store.readme_sha(repo_key)
+    with span("publish.sync", project=project), ThreadPoolExecutor(max_workers=2) as pool:
+        readme_job = pool.submit(gh.upsert_readme, owner, repo_name, readme, known_sha)
+        issues_job = pool.submit(
+            sync_issues, gh, owner, repo_name, tickets, workers, matcher, existing
+        )
+        readme_sha, readme_changed = readme_job.result()
+        created, skipped = issues_job.result()
+
+    store.record_readme(repo_key, readme_sha)
+    log("📝 README updated" if readme_changed else "📝 README unchanged")
+
+    if created:
+        with span("publish.refresh_issues", project=project):
+            existing = refresh_issues(store, gh, owner, repo_name)
+    store.map_tickets(
+        repo_key,
+        [
+            (i["number"], ticket["name"])
+            for i in existing
+            if (ticket := matcher.match_exact(i["title"])) is not None
+        ],
+    )
+
+    log(f"🐛 Issues created: {created} (skipped: {skipped})")
+    summary.update(readme="updated" if readme_changed else "unchanged", created=created, skipped=skipped)
+    return summary
+
+
+def _print_publish_summary(results: list[dict]):
+    from rich.console import Console
+    from rich.markup import escape
+    from rich.table import Table
+
+    table = Table(title="Publish summary")
+    for column in ("Project", "Repo", "README", "Created", "Skipped", "Status"):
+        table.add_column(column)
+
+    for r in results:
+        if "error" in r:
+            table.add_row(r["project"], r.get("repo", ""), "", "", "", f"[red]{escape(r['error'])}[/red]")
+        else:
+            table.add_row(
+                r["project"],
+                f"{r['repo']} ({r['repo_status']})",
+                r["readme"],
+                str(r["created"]),
+                str(r["skipped"]),
+                "[green]ok[/green]",
+            )
+
+    Console().print(table)
 
-    print(f"📄 Contract generated: {path}")
 
 @app.command()
-def publish(project: str):
+def publish(
+    project: Optional[str] = typer.Argument(None),
+    all_projects: bool = typer.Option(
+        False,
+        "--all",
+        help="Publish every project under projects_root",
+    ),
+    workers: int = typer.Option(DEFAULT_WORKERS, help="Concurrent GitHub requests for issue creation"),
+    jobs: int = typer.Option(DEFAULT_WORKERS, help="Projects published concurrently with --all"),
+):
     """
     Publish project to GitHub (repo, README, issues).
     """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    from rich.markup import escape
+
+    from pcos.config import load_config, ConfigError
+    from pcos.contracts import list_projects, projects_with_contract
+    from pcos.github import make_github_client
+    from pcos.state import StateStore
+
+    if not project and not all_projects:
+        print("[red]Give a project name or --all[/red]")
+        raise typer.Exit(1)
+
     try:
         cfg = load_config(Path("config.yaml"))
         print("[green]✓ Config loaded[/green]")
@@ -181,88 +456,201 @@ def publish(project: str):
         print(f"[red]Config error:[/red] {e}")
         raise typer.Exit(1)
 
-    print("✓ Loading contract")
-    contract = load_project_contract(cfg, project)
-
-    repo_name = project.lower().replace(" ", "-")
-
-    gh = GitHubClient()
+    gh = make_github_client(cfg)
     print("✓ Getting authenticated user")
     user = gh.get_user()
     owner = user["login"]
-    print("✓ Resolving repo")
-    repo = gh.get_repo(owner, repo_name)
-    if not repo:
-        print(f"📦 Creating repo {owner}/{repo_name}")
-        gh.create_repo(repo_name, private=False)
-    else:
-        print(f"📦 Repo exists {owner}/{repo_name}")
-
-    print("✓ Sync README")
-    readme = render_readme(contract)
-    gh.upsert_readme(owner, repo_name, readme)
+    store = StateStore()
 
-    print("✓ Sync issues")
-    tickets = contract.get("tickets", [])
-    created = sync_issues(gh, owner, repo_name, tickets)
+    if not all_projects:
+        _publish_project(cfg, gh, store, owner, project, workers)
+        print("✅ Publish done")
+        return
 
-    print(f"🐛 Issues created: {created}")
+    folders = list_projects(cfg)
+    projects = projects_with_contract(cfg, folders)
+    pending = [p for p in folders if p not in projects]
+    if pending:
+        print(f"⏭️ Skipping {len(pending)} projects without a contract yet: {escape(', '.join(pending))}")
+    print(f"✓ Publishing {len(projects)} projects")
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {
+            pool.submit(
+                _publish_project, cfg, gh, store, owner, p, workers, lambda *_: None
+            ): p
+            for p in projects
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results.append(future.result())
+                print(f"✓ {name}")
+            except Exception as e:
+                results.append({"project": name, "error": str(e)})
+                print(f"❌ {name}: {escape(str(e))}")
+
+    results.sort(key=lambda r: r["project"])
+    _print_publish_summary(results)
+
+    if any("error" in r for r in results):
+        raise typer.Exit(1)
     print("✅ Publish done")
 
+def _load_schedule_work(cfg: dict, gh, store, owner: str, project: str):
+    from pcos.contracts import load_project_contract
+    from pcos.state import open_unscheduled_issues
+    from pcos.tracing import span
+
+    with span("schedule.load_project", project=project):
+        contract = load_project_contract(cfg, project)
+        repo = project.lower()
+        issues = open_unscheduled_issues(store, gh, owner, repo)
+    return project, repo, contract.get("tickets", []), issues
+
+
 @app.command()
-def schedule(project: str):
+def schedule(
+    project: Optional[str] = typer.Argument(None),
+    all_projects: bool = typer.Option(
+        False,
+        "--all",
+        help="Schedule every project under projects_root in one shared plan",
+    ),
+    workers: int = typer.Option(DEFAULT_WORKERS, help="Projects loaded concurrently with --all"),
+):
     """
     Schedule GitHub issues into Google Calendar.
     """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from datetime import datetime, timedelta
+
+    from rich.markup import escape
+
+    from pcos.calendar import CalendarClient
+    from pcos.config import load_config
+    from pcos.contracts import list_projects
+    from pcos.github import make_github_client
+    from pcos.scheduler import estimate_issues, allocate_slots, BusyIndex
+    from pcos.state import StateStore
+    from pcos.tracing import span
+    from pcos.transport import transport_settings
+
+    if not project and not all_projects:
+        print("[red]Give a project name or --all[/red]")
+        raise typer.Exit(1)
 
     print("✓ Loading contract + config")
     cfg = load_config(Path("config.yaml"))
-    contract = load_project_contract(cfg, project)
 
-    gh = GitHubClient()
+    gh = make_github_client(cfg)
     print("✓ Getting authenticated user")
     user = gh.get_user()
     owner = user["login"]
-    repo = project.lower()
 
+    http_settings = transport_settings(cfg, "calendar")
     cal = CalendarClient(
-        Path.home() / ".config/closure-os/google_credentials.json"
+        Path.home() / ".config/closure-os/google_credentials.json",
+        api_root=cfg["calendar"].get("api_root"),
+        timeout=http_settings["timeout"],
+        retries=http_settings["retries"],
     )
-
-    issues = gh.list_open_unscheduled_issues(owner, repo)
-    if not issues:
+    store = StateStore()
+
+    if all_projects:
+        projects = list_projects(cfg)
+        print(f"✓ Loading {len(projects)} projects")
+
+        work = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            jobs = {
+                pool.submit(_load_schedule_work, cfg, gh, store, owner, p): p for p in projects
+            }
+            for job in as_completed(jobs):
+                try:
+                    work.append(job.result())
+                except Exception as e:
+                    print(f"⚠️ Skipping {jobs[job]}: {e}")
+        work.sort(key=lambda w: w[0])
+    else:
+        work = [_load_schedule_work(cfg, gh, store, owner, project)]
+
+    pairs = []
+    for name, repo, tickets, issues in work:
+        links = []
+        for issue, ticket, estimate in estimate_issues(issues, tickets):
+            pairs.append(({**issue, "project": name, "repo": repo}, ticket, estimate))
+            if ticket:
+                links.append((issue["number"], ticket["name"]))
+        store.map_tickets(f"{owner}/{repo}", links)
+
+    if not pairs:
         print("✅ No issues to schedule")
         return
 
-    tickets = contract.get("tickets", [])
-    
     calendar_cfg = cfg["calendar"]
+
+    start_date = datetime.now()
+    horizon_days = calendar_cfg.get("horizon_days", 90)
+    horizon_end = start_date + timedelta(days=horizon_days)
+    print(f"✓ Reading free/busy for the next {horizon_days} days")
+    busy = BusyIndex(
+        cal.busy_intervals(calendar_cfg["calendar_id"], start_date, horizon_end)
+    )
     
-    schedule = plan_smart_schedule(
-        issues=issues,
-        tickets=tickets,
-        start_date=datetime.now(),
+    schedule = allocate_slots(
+        pairs,
+        start_date=start_date,
         work_hours=calendar_cfg["work_hours"],
         slot_minutes=calendar_cfg["slot_minutes"],
         work_days=calendar_cfg.get("work_days", ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]),
         rest_days_per_week=0,
+        busy=busy,
+        max_events_per_day=calendar_cfg.get("max_events_per_day"),
+        until=horizon_end,
     )
 
     print(f"✓ Scheduling {len(schedule)} issues with smart planning")
+    if len(schedule) < len(pairs):
+        print(
+            f"⚠️ {len(pairs) - len(schedule)} issues left unscheduled: they do not fit "
+            f"in the next {horizon_days} days (calendar.horizon_days)"
+        )
 
+    events = []
     for issue, slot, estimate in schedule:
-        title = f"[{project}] #{issue['number']} {issue['title']}"
-        description = f"{issue['html_url']}\n\nEstimation: {estimate} slots"
-
-        cal.create_event(
-            calendar_id=calendar_cfg["calendar_id"],
-            title=title,
-            description=description,
-            start=slot,
-            duration_minutes=calendar_cfg["slot_minutes"],
+        events.append(
+            {
+                "title": f"[{issue['project']}] #{issue['number']} {issue['title']}",
+                "description": f"{issue['html_url']}\n\nEstimation: {estimate} slots",
+                "start": slot,
+                "duration_minutes": calendar_cfg["slot_minutes"],
+            }
         )
 
-        gh.add_label(owner, repo, issue["number"], "scheduled")
-        print(f"📅 Scheduled {title} (estimate: {estimate} slots) on {slot.strftime('%Y-%m-%d %H:%M')}")
+    results = cal.create_events(calendar_cfg["calendar_id"], events)
+
+    scheduled = {}
+    booked = {}
+    for (issue, slot, estimate), event, (created, error) in zip(schedule, events, results):
+        if error:
+            print(f"❌ Could not schedule {escape(event['title'])}: {error}")
+            continue
+
+        scheduled.setdefault(issue["repo"], []).append(issue["number"])
+        booked.setdefault(issue["repo"], []).append(
+            (issue["number"], calendar_cfg["calendar_id"], created["id"], slot)
+        )
+        print(f"📅 Scheduled {escape(event['title'])} (estimate: {estimate} slots) on {slot.strftime('%Y-%m-%d %H:%M')}")
+
+    for repo, events_booked in booked.items():
+        store.record_events(f"{owner}/{repo}", events_booked)
+
+    for repo, numbers in scheduled.items():
+        with span("schedule.label", repo=repo):
+            _, failures = gh.add_labels(owner, repo, numbers, "scheduled")
+        for number, error in failures:
+            print(f"⚠️ Could not label {repo}#{number} as scheduled: {error}")
 
     print("✅ Scheduling done")
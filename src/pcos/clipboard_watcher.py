@@ -1,21 +1,30 @@
+import base64
 import hashlib
+import os
+import queue
 import re
 import shutil
 import signal
 import subprocess
 import sys
+import threading
 import time
+from collections import OrderedDict
 from typing import Optional, Set
 
-import yaml
+from pcos.contracts import brainstorm_path
+from pcos.frontmatter import try_parse_frontmatter
+from pcos.obsidian import make_obsidian_client
 
 # =========================
 # Defaults
 # =========================
 
-DEFAULT_CHECK_INTERVAL = 1.0
-DEFAULT_DEBOUNCE_SECONDS = 3.0
-DEFAULT_ALLOWED_TAGS = {"brainstorm", "pcos"}
+from pcos.defaults import DEFAULT_BACKEND, DEFAULT_CHECK_INTERVAL
+
+METADATA_MEMO_SIZE = 64
+CAPTURE_ATTEMPTS = 4
+CAPTURE_BACKOFF_SECONDS = 0.5
 
 # =========================
 # Runtime state
@@ -38,20 +47,8 @@ def handle_sigint(sig, frame):
 # Frontmatter parsing
 # =========================
 
-FRONTMATTER_RE = re.compile(r"^---\n(.*?)\n---", re.DOTALL)
-
-
 def extract_frontmatter(text: str) -> Optional[dict]:
-    match = FRONTMATTER_RE.match(text.strip())
-    if not match:
-        return None
-
-    raw_yaml = match.group(1)
-    try:
-        data = yaml.safe_load(raw_yaml)
-        return data if isinstance(data, dict) else None
-    except Exception:
-        return None
+    return try_parse_frontmatter(text.strip())
 
 
 def extract_brainstorm_metadata(text: str, allowed_tags: Set[str]) -> Optional[dict]:
@@ -138,6 +135,315 @@ def read_clipboard_text() -> str:
     return (text or "").replace("\r\n", "\n")
 
 
+# =========================
+# Change detection
+# =========================
+
+FRONTMATTER_PREFIX_RE = re.compile(r"\s*---")
+
+
+class ClipboardFilter:
+    """
+    Staged per-tick filter, cheapest test first:
+
+    1. "---" prefix check (logs and other non-frontmatter text stop here
+       after a few bytes)
+    2. length + built-in string hash against the last settled text
+       (an unchanged brainstorm stops here)
+    3. YAML frontmatter parsing, memoized by content hash
+
+    `settle()` marks the current text as fully handled so identical
+    follow-up ticks stop at stage 1.
+    """
+
+    def __init__(self, allowed_tags: Set[str], memo_size: int = METADATA_MEMO_SIZE):
+        self.allowed_tags = allowed_tags
+        self.memo_size = memo_size
+        self.memo: OrderedDict = OrderedDict()
+        self.settled_key = None
+        self.current_key = None
+
+    def check(self, text: str) -> Optional[tuple]:
+        """
+        (stripped_text, content_hash, metadata) for a brainstorm candidate,
+        None otherwise.
+        """
+        if not FRONTMATTER_PREFIX_RE.match(text):
+            self.current_key = None
+            return None
+
+        key = (len(text), hash(text))
+        self.current_key = key
+        if key == self.settled_key:
+            return None
+
+        stripped = text.strip()
+        h = hash_text(stripped)
+
+        if h in self.memo:
+            self.memo.move_to_end(h)
+            metadata = self.memo[h]
+        else:
+            metadata = extract_brainstorm_metadata(stripped, allowed_tags=self.allowed_tags)
+            self.memo[h] = metadata
+            if len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+
+        if not metadata:
+            self.settle()
+            return None
+
+        return stripped, h, metadata
+
+    def settle(self):
+        self.settled_key = self.current_key
+
+
+# =========================
+# Clipboard backends
+# =========================
+#
+# A backend hands the watcher clipboard contents through next_change(timeout),
+# which returns the new text, or None when nothing changed before the timeout.
+# The long-lived backends keep one helper process around that only speaks up
+# when the clipboard actually changes, instead of spawning a process per poll.
+
+
+class ClipboardBackendError(Exception):
+    pass
+
+
+class PollingBackend:
+    """Original behaviour: read the whole clipboard every `interval` seconds."""
+
+    name = "poll"
+
+    def __init__(self, interval: float = DEFAULT_CHECK_INTERVAL):
+        self.interval = interval
+
+    def next_change(self, timeout: float) -> Optional[str]:
+        time.sleep(min(timeout, self.interval))
+        return read_clipboard_text()
+
+    def close(self):
+        pass
+
+
+class FakeBackend:
+    """
+    In-memory backend for tests: push() what the clipboard should become.
+    Not in BACKENDS; pass the object itself to watch_clipboard.
+    """
+
+    name = "fake"
+
+    def __init__(self):
+        self.changes: "queue.Queue[str]" = queue.Queue()
+
+    def push(self, text: str):
+        self.changes.put(text)
+
+    def next_change(self, timeout: float) -> Optional[str]:
+        try:
+            return self.changes.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+
+class StreamBackend:
+    """
+    Runs one helper process that prints a base64 line per clipboard change,
+    and decodes those lines on a reader thread.
+    """
+
+    name = "stream"
+    command: list = []
+
+    def __init__(self):
+        self.changes: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        for line in self.proc.stdout:
+            try:
+                raw = base64.b64decode(line.strip())
+            except ValueError:
+                continue
+            self.changes.put(raw.decode("utf-8", errors="replace").replace("\r\n", "\n"))
+        self.changes.put(None)  # helper exited
+
+    def next_change(self, timeout: float) -> Optional[str]:
+        try:
+            text = self.changes.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if text is None:
+            try:
+                code = self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                code = None
+            raise ClipboardBackendError(
+                f"{self.name} clipboard helper exited (code {code})"
+            )
+        return text
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+POWERSHELL_WATCH_SCRIPT = r"""
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+Add-Type -Namespace PCOS -Name User32 -MemberDefinition '[DllImport("user32.dll")] public static extern uint GetClipboardSequenceNumber();'
+$last = -1
+while ($true) {
+    $seq = [PCOS.User32]::GetClipboardSequenceNumber()
+    if ($seq -ne $last) {
+        $last = $seq
+        $c = Get-Clipboard -Raw
+        if ($null -eq $c) { $c = '' }
+        [Console]::Out.WriteLine([Convert]::ToBase64String([Text.Encoding]::UTF8.GetBytes($c)))
+        [Console]::Out.Flush()
+    }
+    Start-Sleep -Milliseconds 200
+}
+"""
+
+
+class PowerShellBackend(StreamBackend):
+    """
+    WSL/Windows: a single powershell.exe that watches the clipboard sequence
+    number and only reads the clipboard when it changes.
+    """
+
+    name = "powershell"
+    command = [
+        "powershell.exe",
+        "-NoProfile",
+        "-NonInteractive",
+        "-EncodedCommand",
+        base64.b64encode(POWERSHELL_WATCH_SCRIPT.encode("utf-16-le")).decode(),
+    ]
+
+
+class WlPasteBackend(StreamBackend):
+    """Wayland: `wl-paste --watch` runs the encoder once per new selection."""
+
+    name = "wl-paste"
+    command = ["wl-paste", "--no-newline", "--watch", "sh", "-c", "base64 -w0; echo"]
+
+
+class X11Backend(StreamBackend):
+    """X11: block on selection events with clipnotify, then read with xclip."""
+
+    name = "x11"
+    command = [
+        "sh",
+        "-c",
+        "while clipnotify -s clipboard; do "
+        "xclip -selection clipboard -o 2>/dev/null | base64 -w0; echo; done",
+    ]
+
+
+BACKENDS = {
+    "powershell": PowerShellBackend,
+    "wl-paste": WlPasteBackend,
+    "x11": X11Backend,
+    "poll": PollingBackend,
+}
+
+
+def detect_backend() -> str:
+    if shutil.which("powershell.exe"):
+        return "powershell"
+    if os.environ.get("WAYLAND_DISPLAY") and shutil.which("wl-paste"):
+        return "wl-paste"
+    if os.environ.get("DISPLAY") and shutil.which("clipnotify") and shutil.which("xclip"):
+        return "x11"
+    return "poll"
+
+
+def make_backend(name: str = DEFAULT_BACKEND, check_interval: float = DEFAULT_CHECK_INTERVAL):
+    if name == "auto":
+        name = detect_backend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown clipboard backend: {name} (choose from auto, {', '.join(BACKENDS)})")
+    if name == "poll":
+        return PollingBackend(check_interval)
+    return BACKENDS[name]()
+
+
+# =========================
+# Capture worker
+# =========================
+
+
+class CaptureWorker:
+    """
+    Writes detected brainstorms to the vault on a background thread, so the
+    clipboard loop keeps running while a write is slow or being retried.
+    Holds one warm vault client for the whole session.
+    """
+
+    def __init__(self, cfg: dict, attempts: int = CAPTURE_ATTEMPTS, backoff: float = CAPTURE_BACKOFF_SECONDS):
+        self.cfg = cfg
+        self.attempts = attempts
+        self.backoff = backoff
+        self.note_path = lambda project: brainstorm_path(cfg, project)
+        self.client = make_obsidian_client(cfg)
+        self.jobs: "queue.Queue" = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, project: str, text: str):
+        self.jobs.put((project, text, time.perf_counter()))
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            self._capture(*job)
+
+    def _capture(self, project: str, text: str, detected_at: float):
+        path = self.note_path(project)
+
+        for attempt in range(1, self.attempts + 1):
+            try:
+                self.client.write_note(path, text)
+            except Exception as e:
+                if attempt == self.attempts:
+                    print(f"❌ Capture failed for {project} after {attempt} attempts: {e}")
+                    return
+                delay = self.backoff * (2 ** (attempt - 1))
+                print(f"⚠️ Capture of {project} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            latency_ms = (time.perf_counter() - detected_at) * 1000
+            print(f"✓ Brainstorm captured → {path} ({latency_ms:.0f} ms, attempt {attempt})")
+            return
+
+    def stop(self, timeout: float = 10.0):
+        """Let queued captures finish, up to `timeout` seconds."""
+        self.jobs.put(None)
+        self.thread.join(timeout)
+
+
 # =========================
 # Utilities
 # =========================
@@ -154,69 +460,83 @@ def hash_text(text: str) -> str:
 
 def watch_clipboard(
     *,
+    cfg: dict,
     project: Optional[str],
     allowed_tags: Set[str],
     debounce_seconds: float,
     check_interval: float,
+    backend=DEFAULT_BACKEND,
 ):
+    """
+    `backend` is a backend name (see BACKENDS, or "auto") or an already
+    built backend object such as FakeBackend.
+    """
     global running
     running = True
-    
+
+    # The worker first: a config error then leaves no helper process behind.
+    worker = CaptureWorker(cfg)
     old_handler = signal.signal(signal.SIGINT, handle_sigint)
-    
+
     try:
+        if isinstance(backend, str):
+            backend = make_backend(backend, check_interval)
+
         print("🧠 Clipboard watcher started (CTRL+C to stop)")
         print(f"• allowed_tags={sorted(allowed_tags)}")
         print(f"• debounce={debounce_seconds}s")
-        print(
-            "• clipboard_backend="
-            + ("win32yank" if shutil.which("win32yank.exe") else "powershell")
-        )
+        print(f"• clipboard_backend={backend.name}")
 
         last_hash: Optional[str] = None
         last_trigger_ts: float = 0.0
+        clipboard_filter = ClipboardFilter(allowed_tags)
+        pending: Optional[str] = None  # candidate held back by the debounce
 
         while running:
             try:
-                text = (read_clipboard_text() or "").strip()
-
-                if not text:
-                    time.sleep(check_interval)
+                text = backend.next_change(timeout=check_interval)
+                if text is None:
+                    if pending is None:
+                        continue
+                    text = pending
+
+                candidate = clipboard_filter.check(text)
+                pending = None
+                if candidate is None:
                     continue
 
-                metadata = extract_brainstorm_metadata(text, allowed_tags=allowed_tags)
-                if not metadata:
-                    time.sleep(check_interval)
+                stripped, h, metadata = candidate
+                if h == last_hash:
+                    clipboard_filter.settle()
                     continue
 
-                resolved_project = project or metadata["project"]
-
-                h = hash_text(text)
                 now = time.time()
+                if (now - last_trigger_ts) <= debounce_seconds:
+                    pending = text
+                    continue
 
-                if h != last_hash and (now - last_trigger_ts) > debounce_seconds:
-                    print(f"✨ Brainstorm detected → project={resolved_project}")
-
-                    subprocess.run(
-                        ["pcos", "capture", "--project", resolved_project],
-                        input=text,
-                        text=True,
-                        check=True,
-                    )
+                resolved_project = project or metadata["project"]
+                print(f"✨ Brainstorm detected → project={resolved_project}")
+                worker.submit(resolved_project, stripped)
 
-                    last_hash = h
-                    last_trigger_ts = now
+                last_hash = h
+                last_trigger_ts = now
+                clipboard_filter.settle()
 
-            except subprocess.CalledProcessError as e:
-                print("❌ pcos capture failed:", e)
+            except ClipboardBackendError as e:
+                print(f"⚠️ {e}, falling back to polling")
+                backend.close()
+                backend = PollingBackend(check_interval)
 
             except Exception as e:
                 print("⚠️ Watcher error:", e)
-
-            time.sleep(check_interval)
+                time.sleep(check_interval)
 
         print("👋 Watcher stopped.")
     finally:
+        worker.stop()
+        if not isinstance(backend, str):
+            backend.close()
         signal.signal(signal.SIGINT, old_handler)
     
-    sys.exit(0)
\ No newline at end of file
+    sys.exit(0)
@@ -1,8 +1,42 @@
-from pcos.llm import LLMClient
-from pcos.obsidian import ObsidianClient
+from pcos.llm import (
+    COMPLETION_TOKENS_ESTIMATE,
+    LLMClient,
+    MODEL,
+    SYSTEM_PROMPT,
+    TEMPERATURE,
+    TOKENS_PER_MINUTE,
+    ResponseCache,
+    TokenBudget,
+    estimate_tokens,
+    make_llm_client,
+    sha256_text,
+)
+from pcos.frontmatter import (
+    FRONTMATTER_CLOSE_RE,
+    FRONTMATTER_OPEN_RE,
+    find_frontmatter,
+    load_yaml,
+)
+from pcos.obsidian import make_obsidian_client
+from pcos.parser import contract_errors
 from pcos.prompts import PROJECT_CONTRACT_PROMPT
-from pcos.config import get_env
+from pcos.contracts import brainstorm_path, contract_path, list_projects
+from pathlib import PurePosixPath
+from typing import Callable, Iterable, Iterator
+import asyncio
 import re
+import yaml
+
+# Editing the prompt changes this, so old cached responses stop matching.
+PROMPT_VERSION = sha256_text(SYSTEM_PROMPT + PROJECT_CONTRACT_PROMPT)[:16]
+
+GENERATION_ATTEMPTS = 3
+# Give up on a completion that has not opened its frontmatter by then.
+MAX_PREAMBLE_CHARS = 2000
+
+
+class ContractStreamError(RuntimeError):
+    pass
 
 def extract_frontmatter_content(text: str) -> str:
     """
@@ -28,50 +62,251 @@ def ensure_frontmatter_closed(text: str) -> str:
     """
     Ensure the frontmatter is properly closed with a second ---
     """
-    if not text.strip().startswith("---"):
+    stripped = text.lstrip()
+    if not stripped.startswith("---") or find_frontmatter(stripped):
         return text
-    
-    parts = text.split("---", 2)
-    
-    if len(parts) >= 2:
-        if len(parts) == 2:
-            yaml_content = parts[1]
-            lines = yaml_content.split('\n')
-            
-            last_yaml_line_idx = 0
-            for i, line in enumerate(lines):
-                if line.strip():
-                    last_yaml_line_idx = i
-            
-            lines.insert(last_yaml_line_idx + 1, "---")
-            parts[1] = '\n'.join(lines)
-            return "---".join(parts)
+
+    # Unclosed: close it after the last non-empty line.
+    return text.rstrip() + "\n---\n"
+
+def check_frontmatter(block: str) -> dict:
+    """
+    Validate a contract frontmatter block against the contract schema (the
+    one the prompt asks for); raises ContractStreamError when the model
+    went off-schema.
+    """
+    try:
+        data = load_yaml(block)
+    except yaml.YAMLError as e:
+        raise ContractStreamError(f"Invalid YAML frontmatter: {e}") from e
+
+    errors = contract_errors(data)
+    if errors:
+        raise ContractStreamError("; ".join(errors))
+
+    return data
+
+
+class ContractStream:
+    """
+    Turns raw LLM output chunks into contract note text.
+
+    Text before the opening --- is dropped, the frontmatter is buffered and
+    validated as soon as its closing --- arrives, then the body is passed
+    through chunk by chunk. Off-schema output raises ContractStreamError at
+    that point, closing the upstream generator (and its connection) instead
+    of paying for the rest of the completion. `raw` keeps what was received.
+    """
+
+    def __init__(self, chunks: Iterable[str]):
+        self.chunks = iter(chunks)
+        self.raw: list[str] = []
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            yield from self._note()
+        finally:
+            close = getattr(self.chunks, "close", None)
+            if close:
+                close()
+
+    def _note(self) -> Iterator[str]:
+        buffer = ""
+        opened = False
+
+        for chunk in self.chunks:
+            self.raw.append(chunk)
+            buffer += chunk
+
+            if not opened:
+                match = FRONTMATTER_OPEN_RE.search(buffer)
+                if not match:
+                    if len(buffer) > MAX_PREAMBLE_CHARS:
+                        raise ContractStreamError("LLM output does not start with frontmatter")
+                    continue
+                buffer = buffer[match.start():]
+                opened = True
+
+            first_line = buffer.index("\n")
+            close = FRONTMATTER_CLOSE_RE.search(buffer, first_line)
+            if close and close.group().endswith("\n"):
+                check_frontmatter(buffer[first_line:close.start()])
+                yield buffer
+                break
         else:
-            return text
-    
-    return text
+            # Completion over before the frontmatter closed: fall back to
+            # the after-the-fact repair.
+            text = extract_frontmatter_content("".join(self.raw))
+            if not text.strip().startswith("---"):
+                raise ContractStreamError("LLM output is not valid contract (no frontmatter)")
+            text = ensure_frontmatter_closed(text)
+            span = find_frontmatter(text)
+            if span is None:
+                raise ContractStreamError("LLM output has a malformed frontmatter")
+            check_frontmatter(text[span[0]:span[1]])
+            yield text
+            return
+
+        for chunk in self.chunks:
+            self.raw.append(chunk)
+            yield chunk
 
-def generate_contract(cfg: dict, project: str):
-    obsidian = ObsidianClient( 
-            base_url=cfg["obsidian_api_base"],
-            vault_name=cfg["vault_name"],
-            api_key=get_env("OBSIDIAN_API_KEY"),)
 
-    brainstorm_path = f"{cfg['projects_root']}/{project}/00_brainstorm.md"
-    output_path = f"{cfg['projects_root']}/{project}/01_project_contract.md"
+def response_key(cfg: dict, brainstorm: str) -> str:
+    llm_cfg = cfg.get("llm", {})
+    return ResponseCache.key(
+        model=llm_cfg.get("model", MODEL),
+        temperature=llm_cfg.get("temperature", TEMPERATURE),
+        prompt_version=PROMPT_VERSION,
+        brainstorm=sha256_text(brainstorm),
+    )
+
+
+def generate_contract(
+    cfg: dict,
+    project: str,
+    cache: ResponseCache | None = None,
+    refresh: bool = False,
+    llm: LLMClient | None = None,
+    before_request: Callable[[str], None] | None = None,
+):
+    """
+    Write the project contract generated from its brainstorm.
 
-    brainstorm = obsidian.read_note(brainstorm_path)
+    With a `cache`, the LLM is only called when no response is stored for
+    this model, temperature, prompt version and brainstorm; `refresh`
+    skips the lookup but still stores the new response. `llm` lets batch
+    runs share one client (and its connection pool). `before_request` is
+    called with the prompt before every API call, retries included (batch
+    runs wait for their token budget there).
+
+    Returns (contract path, whether the response came from the cache).
+    """
+    obsidian = make_obsidian_client(cfg)
+    llm_cfg = cfg.get("llm", {})
+
+    output_path = contract_path(cfg, project)
+
+    brainstorm = obsidian.read_note(brainstorm_path(cfg, project))
+
+    key = response_key(cfg, brainstorm)
+    cached = None
+    if cache is not None and not refresh:
+        cached = cache.get(key)
 
     prompt = PROJECT_CONTRACT_PROMPT.format(brainstorm=brainstorm)
+    error = None
 
-    llm = LLMClient()
-    result = llm.generate(prompt)
-    result = extract_frontmatter_content(result)
-    if not result.strip().startswith("---"):
-        raise RuntimeError("LLM output is not valid contract (no frontmatter)")
-    
-    result = ensure_frontmatter_closed(result)
+    for attempt in range(GENERATION_ATTEMPTS):
+        from_cache = attempt == 0 and cached is not None
+        if from_cache:
+            chunks = iter([cached])
+        else:
+            if llm is None:
+                llm = make_llm_client(cfg)
+            if before_request is not None:
+                before_request(prompt)
+            chunks = llm.stream(prompt) if llm_cfg.get("stream", True) else iter([llm.generate(prompt)])
+
+        stream = ContractStream(chunks)
+        try:
+            obsidian.write_note_stream(output_path, stream)
+        except ContractStreamError as e:
+            error = e
+            continue
+
+        # Only cache responses that produced a contract.
+        if cache is not None and not from_cache:
+            cache.put(key, "".join(stream.raw))
+        return output_path, from_cache
+
+    raise RuntimeError(
+        f"LLM output is not a valid contract after {GENERATION_ATTEMPTS} attempts: {error}"
+    )
+
+
+async def stale_projects(cfg: dict, store, jobs: int = 4) -> list[str]:
+    """
+    Projects with a brainstorm whose contract is missing, or was generated
+    from a different version of the brainstorm (per the state store).
+
+    A contract with no recorded brainstorm predates the state store: the
+    current brainstorm is recorded as its source rather than overwriting a
+    contract that may have been edited by hand.
+    """
+    obsidian = make_obsidian_client(cfg)
+
+    def check(project: str) -> bool:
+        entries = obsidian.list_dir(f"{cfg['projects_root']}/{project}")
+        if PurePosixPath(brainstorm_path(cfg, project)).name not in entries:
+            return False
+
+        h = sha256_text(obsidian.read_note(brainstorm_path(cfg, project)))
+        if PurePosixPath(contract_path(cfg, project)).name not in entries:
+            return True
+
+        recorded = store.brainstorm_hash(project)
+        if recorded is None:
+            store.record_brainstorm(project, h)
+            return False
+        return recorded != h
+
+    semaphore = asyncio.Semaphore(max(1, jobs))
+
+    async def bounded(project: str) -> bool:
+        async with semaphore:
+            return await asyncio.to_thread(check, project)
+
+    projects = await asyncio.to_thread(list_projects, cfg)
+    flags = await asyncio.gather(*(bounded(p) for p in projects))
+    return [p for p, stale in zip(projects, flags) if stale]
+
+
+async def generate_contracts(
+    cfg: dict,
+    projects: list[str],
+    store,
+    jobs: int = 4,
+    cache: ResponseCache | None = None,
+    refresh: bool = False,
+    on_result: Callable[[str, bool, Exception | None], None] = lambda *_: None,
+) -> dict:
+    """
+    Generate the contracts of several projects concurrently.
+
+    At most `jobs` generations run at once (each in a worker thread, the
+    HTTP client being synchronous), and each API call, retries included,
+    waits for its estimated token usage to fit the per-minute budget
+    (llm.tokens_per_minute). `on_result(project, cached, error)` is called
+    as each one finishes. Returns {project: error or None}.
+    """
+    llm_cfg = cfg.get("llm", {})
+    obsidian = make_obsidian_client(cfg)
+    semaphore = asyncio.Semaphore(max(1, jobs))
+    budget = TokenBudget(llm_cfg.get("tokens_per_minute", TOKENS_PER_MINUTE))
+    llm = make_llm_client(cfg, max_connections=max(1, jobs))
+    loop = asyncio.get_running_loop()
+
+    def charge(prompt: str):
+        # Runs in the generation's worker thread; the budget lives on the loop.
+        tokens = estimate_tokens(prompt) + COMPLETION_TOKENS_ESTIMATE
+        asyncio.run_coroutine_threadsafe(budget.acquire(tokens), loop).result()
+
+    async def one(project: str):
+        async with semaphore:
+            try:
+                brainstorm = await asyncio.to_thread(
+                    obsidian.read_note, brainstorm_path(cfg, project)
+                )
+                _, cached = await asyncio.to_thread(
+                    generate_contract, cfg, project, cache, refresh, llm, charge
+                )
+                store.record_brainstorm(project, sha256_text(brainstorm))
+            except Exception as e:
+                on_result(project, False, e)
+                return project, e
 
-    obsidian.write_note(output_path, result)
+        on_result(project, cached, None)
+        return project, None
 
-    return output_path
\ No newline at end of file
+    return dict(await asyncio.gather(*(one(p) for p in projects)))
@@ -1,15 +1,48 @@
-from pcos.obsidian import ObsidianClient
-import yaml
-from pcos.config import get_env
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+import os
+
+from pcos.frontmatter import FrontmatterError, parse_frontmatter
+from pcos.obsidian import make_obsidian_client
+from pcos.parser import check_contract_text
+
+
+def brainstorm_path(cfg: dict, project: str) -> str:
+    return f"{cfg['projects_root']}/{project}/00_brainstorm.md"
+
+
+def contract_path(cfg: dict, project: str) -> str:
+    return f"{cfg['projects_root']}/{project}/01_project_contract.md"
+
+
+def list_projects(cfg: dict) -> list[str]:
+    """
+    Every project folder under `projects_root` in the vault.
+    """
+    entries = make_obsidian_client(cfg).list_dir(cfg["projects_root"])
+    return sorted(e.rstrip("/") for e in entries if e.endswith("/"))
+
+
+def has_contract(cfg: dict, project: str) -> bool:
+    entries = make_obsidian_client(cfg).list_dir(f"{cfg['projects_root']}/{project}")
+    return PurePosixPath(contract_path(cfg, project)).name in entries
+
+
+def projects_with_contract(cfg: dict, projects: list[str] | None = None) -> list[str]:
+    """
+    The projects (by default every one under `projects_root`) that have a
+    contract; a freshly captured one only has its brainstorm.
+    """
+    if projects is None:
+        projects = list_projects(cfg)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        flags = list(pool.map(lambda p: has_contract(cfg, p), projects))
+    return [p for p, flag in zip(projects, flags) if flag]
 
 
 def load_project_contract(cfg: dict, project: str) -> dict:
-    obsidian = ObsidianClient(
-        base_url=cfg["obsidian_api_base"],
-        vault_name=cfg["vault_name"],
-        api_key=get_env("OBSIDIAN_API_KEY"),
-    )
-    path = f"{cfg['projects_root']}/{project}/01_project_contract.md"
+    obsidian = make_obsidian_client(cfg)
+    path = contract_path(cfg, project)
 
     raw = obsidian.read_note(path)
 
@@ -17,20 +50,53 @@ def load_project_contract(cfg: dict, project: str) -> dict:
         raise ValueError("Contract has no YAML frontmatter")
 
     try:
-        _, frontmatter, _ = raw.split("---", 2)
-    except ValueError:
-        raise ValueError("Invalid YAML frontmatter format (missing closing ---)")
-
-    try:
-        data = yaml.safe_load(frontmatter)
-    except yaml.YAMLError as e:
+        return parse_frontmatter(raw)
+    except FrontmatterError as e:
+        if e.__cause__ is None:  # structural problem, not a YAML syntax error
+            raise
         raise ValueError(
-            f"Invalid YAML in contract frontmatter: {e}\n"
+            f"Invalid YAML in contract frontmatter: {e.__cause__}\n"
             f"Hint: Values containing ':' (like 'ex: example') must be quoted in YAML.\n"
             f"Example: description: \"text with (ex: example)\""
-        ) from e
+        ) from e.__cause__
+
+
+def validate_projects(cfg: dict, jobs: int | None = None) -> list[dict]:
+    """
+    Validate the contract of every project under `projects_root`.
+
+    Contracts are read concurrently (I/O), then parsed and checked against
+    the contract schema in a process pool (CPU). Projects without a
+    contract yet are skipped. Returns one report row per contract:
+    {"project", "path", "valid", "errors"}, sorted by project.
+    """
+    # Imports multiprocessing: kept off the `pcos capture` path.
+    from concurrent.futures import ProcessPoolExecutor
+
+    obsidian = make_obsidian_client(cfg)
+
+    def read(project: str) -> tuple[str, str | None]:
+        if not has_contract(cfg, project):
+            return project, None
+        return project, obsidian.read_note(contract_path(cfg, project))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        texts = [(p, t) for p, t in pool.map(read, list_projects(cfg)) if t is not None]
+
+    if not texts:
+        return []
 
-    if not isinstance(data, dict):
-        raise ValueError("Invalid contract format")
+    workers = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(texts) // (4 * workers))
+        results = pool.map(check_contract_text, [t for _, t in texts], chunksize=chunksize)
 
-    return data
+        return [
+            {
+                "project": project,
+                "path": contract_path(cfg, project),
+                "valid": not errors,
+                "errors": errors,
+            }
+            for (project, _), errors in zip(texts, results)
+        ]
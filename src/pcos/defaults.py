@@ -0,0 +1,9 @@
+# Defaults shared by the CLI options and the modules implementing them.
+# Kept dependency-free so `pcos --help` does not import the heavy clients.
+
+DEFAULT_CHECK_INTERVAL = 1.0
+DEFAULT_DEBOUNCE_SECONDS = 3.0
+DEFAULT_ALLOWED_TAGS = {"brainstorm", "pcos"}
+DEFAULT_BACKEND = "auto"
+
+DEFAULT_WORKERS = 4
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+import copy
+import hashlib
+import re
+import threading
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader  # libyaml, ~10x faster
+except ImportError:
+    from yaml import SafeLoader
+
+PARSE_CACHE_SIZE = 512
+
+# A frontmatter opens with a "---" line at the very start of the document
+# and closes at the next "---" line.
+FRONTMATTER_OPEN_RE = re.compile(r"^---[ \t]*\r?\n", re.MULTILINE)
+FRONTMATTER_CLOSE_RE = re.compile(r"\n---[ \t]*(?:\r?\n|$)")
+
+
+class FrontmatterError(ValueError):
+    pass
+
+
+_cache: OrderedDict = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def find_frontmatter(text: str) -> tuple[int, int, int] | None:
+    """
+    (block start, block end, body start) offsets of the YAML frontmatter,
+    or None if `text` does not start with a closed one. Only the
+    frontmatter is scanned, however long the body.
+    """
+    opening = FRONTMATTER_OPEN_RE.match(text)
+    if not opening:
+        return None
+
+    # Start on the opening line's newline so an empty block still closes.
+    closing = FRONTMATTER_CLOSE_RE.search(text, opening.end() - 1)
+    if not closing:
+        return None
+
+    return opening.end(), max(opening.end(), closing.start()), closing.end()
+
+
+def load_yaml(block: str):
+    """
+    yaml.safe_load with libyaml when available, memoized by content hash.
+    Callers get their own copy of the result.
+    """
+    key = hashlib.blake2b(block.encode("utf-8"), digest_size=16).digest()
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return copy.deepcopy(_cache[key])
+
+    data = yaml.load(block, Loader=SafeLoader)
+
+    with _cache_lock:
+        _cache[key] = data
+        if len(_cache) > PARSE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return copy.deepcopy(data)
+
+
+def parse_frontmatter(text: str) -> dict:
+    """
+    The frontmatter of a Markdown document as a dict; raises
+    FrontmatterError (a ValueError) when it is missing or malformed.
+    """
+    if not text.startswith("---"):
+        raise FrontmatterError("Document must start with YAML frontmatter")
+
+    span = find_frontmatter(text)
+    if span is None:
+        raise FrontmatterError("Invalid YAML frontmatter format (missing closing ---)")
+
+    start, end, _ = span
+    try:
+        data = load_yaml(text[start:end])
+    except yaml.YAMLError as e:
+        raise FrontmatterError(f"Invalid YAML: {e}") from e
+
+    if not isinstance(data, dict):
+        raise FrontmatterError("Frontmatter must be a YAML object")
+    return data
+
+
+def try_parse_frontmatter(text: str) -> dict | None:
+    """
+    parse_frontmatter, or None instead of an error.
+    """
+    try:
+        return parse_frontmatter(text)
+    except FrontmatterError:
+        return None
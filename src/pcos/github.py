@@ -1,67 +1,342 @@
+from pathlib import Path
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import threading
+import time
+
 from pcos.config import get_env
+from pcos.transport import RETRY_STATUSES, Transport, make_transport
 import requests
 
+API_URL = "https://api.github.com"  # overridden by github.api_url
+CACHE_PATH = Path.home() / ".config/closure-os/github_cache.json"
+PER_PAGE = 100
+MAX_CONCURRENCY = 8
+MAX_RATE_LIMIT_RETRIES = 5
+SECONDARY_RATE_LIMIT_WAIT = 60
+GRAPHQL_BATCH_SIZE = 25
+# Pages kept in the conditional cache; the least recently stored go first.
+MAX_CACHED_PAGES = 500
+# Rate limits (403/429) are left to the client, which slows every worker
+# down; the transport only retries server errors.
+TRANSPORT_RETRY_STATUSES = RETRY_STATUSES - {429}
+
+
+def git_blob_sha(data: bytes) -> str:
+    """
+    SHA-1 git gives a file with these bytes (what the contents API reports).
+    """
+    header = f"blob {len(data)}\0".encode()
+    return hashlib.sha1(header + data).hexdigest()
+
+
+class ConditionalCache:
+    """
+    On-disk ETag / Last-Modified cache for GitHub GET requests.
+
+    Unchanged pages come back as 304 and do not count against the rate limit,
+    so the cached body is replayed instead. At most `max_pages` pages are
+    kept. The file is only read once a request needs it, so clients that
+    never send a conditional request do not pay for loading it.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, max_pages: int = MAX_CACHED_PAGES):
+        self.path = path
+        self.max_pages = max_pages
+        self.dirty = False
+        self.lock = threading.Lock()
+        self._data: dict | None = None
+
+    @property
+    def data(self) -> dict:
+        with self.lock:
+            if self._data is None:
+                try:
+                    self._data = json.loads(self.path.read_text())
+                except (OSError, ValueError):
+                    self._data = {}
+                self._data.setdefault("pages", {})
+                self._data.pop("cursors", None)
+            return self._data
+
+    def headers_for(self, url: str) -> dict:
+        entry = self.data["pages"].get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def get(self, url: str) -> dict | None:
+        return self.data["pages"].get(url)
+
+    def put(self, url: str, r: requests.Response):
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        entry = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": r.json(),
+            "next": r.links.get("next", {}).get("url"),
+        }
+        pages = self.data["pages"]
+        with self.lock:
+            pages.pop(url, None)
+            pages[url] = entry
+            while len(pages) > self.max_pages:
+                del pages[next(iter(pages))]
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._data))
+            tmp.replace(self.path)
+            self.dirty = False
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency gate shared by every request of a client.
+
+    Halves the number of in-flight requests when GitHub answers with a rate
+    limit, pauses everyone until the advertised reset, then grows back by one
+    slot per streak of successful responses.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.active = 0
+        self.resume_at = 0.0
+        self.successes = 0
+        self.cond = threading.Condition()
+
+    def __enter__(self):
+        with self.cond:
+            while True:
+                wait = self.resume_at - time.monotonic()
+                if wait <= 0 and self.active < self.limit:
+                    break
+                self.cond.wait(timeout=wait if wait > 0 else None)
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self.cond:
+            self.active -= 1
+            self.cond.notify_all()
+
+    def throttle(self, delay: float):
+        with self.cond:
+            self.limit = max(1, self.limit // 2)
+            self.successes = 0
+            self.resume_at = max(self.resume_at, time.monotonic() + delay)
+            self.cond.notify_all()
+
+    def relax(self, remaining: int | None = None):
+        with self.cond:
+            if remaining is not None and remaining < self.limit:
+                self.limit = max(1, remaining)
+                return
+            self.successes += 1
+            if self.limit < self.max_concurrency and self.successes >= self.limit:
+                self.limit += 1
+                self.successes = 0
+                self.cond.notify_all()
+
+
+def rate_limit_delay(r: requests.Response, attempt: int) -> float | None:
+    """
+    Seconds to wait before retrying `r`, or None if it is not a rate limit.
+    Covers the primary limit (X-RateLimit-Remaining: 0), Retry-After and
+    secondary rate limits.
+    """
+    if r.status_code not in (403, 429):
+        return None
+
+    retry_after = r.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+
+    if r.headers.get("X-RateLimit-Remaining") == "0":
+        reset = r.headers.get("X-RateLimit-Reset")
+        if reset and reset.isdigit():
+            return max(1.0, int(reset) - time.time())
+
+    if r.status_code == 429 or "rate limit" in r.text.lower():
+        return SECONDARY_RATE_LIMIT_WAIT * (2 ** attempt)
+
+    return None
+
 
 class GitHubClient:
-    def __init__(self):
+    def __init__(
+        self,
+        cache: ConditionalCache | None = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        api: str = API_URL,
+        transport: Transport | None = None,
+    ):
         token = get_env("GITHUB_TOKEN")
-        self.session = requests.Session()
-        self.session.headers.update(
+        self.cache = cache if cache is not None else ConditionalCache()
+        # One pool slot per request the limiter may let through, plus the
+        # nested README/issue jobs of concurrent publishes.
+        self.transport = transport or Transport("github", pool_size=max_concurrency * 2)
+        self.transport.headers.update(
             {
                 "Authorization": f"token {token}",
                 "Accept": "application/vnd.github+json",
             }
         )
-        self.api = "https://api.github.com"
+        self.api = api.rstrip("/")
+        self.limiter = AdaptiveLimiter(max_concurrency)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            with self.limiter:
+                r = self.transport.request(
+                    method, url, retry_statuses=TRANSPORT_RETRY_STATUSES, **kwargs
+                )
+
+            delay = rate_limit_delay(r, attempt)
+            if delay is None or attempt == MAX_RATE_LIMIT_RETRIES:
+                break
+
+            print(f"⏳ GitHub rate limit hit, retrying in {delay:.0f}s")
+            self.limiter.throttle(delay)
+
+        remaining = r.headers.get("X-RateLimit-Remaining")
+        self.limiter.relax(int(remaining) if remaining and remaining.isdigit() else None)
+        return r
 
     # ---------- Repo ----------
 
     def get_repo(self, owner: str, name: str):
-        r = self.session.get(f"{self.api}/repos/{owner}/{name}")
+        r = self._request("GET", f"{self.api}/repos/{owner}/{name}")
         return r if r.status_code == 200 else None
 
     def create_repo(self, name: str, private: bool = False):
         payload = {"name": name, "private": private}
-        r = self.session.post(f"{self.api}/user/repos", json=payload)
+        r = self._request("POST", f"{self.api}/user/repos", json=payload)
         r.raise_for_status()
         return r.json()
 
     def get_user(self):
-        r = self.session.get(f"{self.api}/user")
+        r = self._request("GET", f"{self.api}/user")
         r.raise_for_status()
         return r.json()
 
     # ---------- README ----------
 
-    def upsert_readme(self, owner: str, repo: str, content: str):
+    def upsert_readme(
+        self,
+        owner: str,
+        repo: str,
+        content: str,
+        known_sha: str | None = None,
+    ) -> tuple[str, bool]:
+        """
+        Create or update README.md unless it already holds `content`.
+
+        `known_sha` is the blob SHA last published for this repo; when it
+        matches the rendered content no request is made at all. Returns
+        (blob_sha, changed).
+        """
         import base64
 
+        raw = content.encode("utf-8")
+        sha = git_blob_sha(raw)
+        if sha == known_sha:
+            return sha, False
+
         path = f"{self.api}/repos/{owner}/{repo}/contents/README.md"
-        encoded = base64.b64encode(content.encode("utf-8")).decode()
+        encoded = base64.b64encode(raw).decode()
 
-        existing = self.session.get(path)
+        existing = self._request("GET", path)
         payload = {"message": "Sync README", "content": encoded}
 
         if existing.status_code == 200:
-            sha = existing.json()["sha"]
-            payload["sha"] = sha
+            current = existing.json()["sha"]
+            if current == sha:
+                return sha, False
+            payload["sha"] = current
 
-        r = self.session.put(path, json=payload)
+        r = self._request("PUT", path, json=payload)
         r.raise_for_status()
+        return r.json()["content"]["sha"], True
 
     # ---------- Issues ----------
 
-    def list_issues(self, owner: str, repo: str):
-        r = self.session.get(
-            f"{self.api}/repos/{owner}/{repo}/issues",
-            params={"state": "all"},
-        )
+    def _get_page(self, url: str, cacheable: bool = True) -> tuple[list, str | None]:
+        headers = self.cache.headers_for(url) if cacheable else {}
+        r = self._request("GET", url, headers=headers)
+
+        if r.status_code == 304:
+            cached = self.cache.get(url)
+            return cached["body"], cached["next"]
+
         r.raise_for_status()
-        return r.json()
+        if cacheable:
+            self.cache.put(url, r)
+        return r.json(), r.links.get("next", {}).get("url")
+
+    def iter_issues(
+        self,
+        owner: str,
+        repo: str,
+        state: str = "all",
+        since: str | None = None,
+        conditional: bool = True,
+    ):
+        """
+        Stream every issue of a repo, following the Link header page by page.
+
+        `since` (ISO 8601) restricts the listing to issues updated after it.
+        Such listings are not cached: each one has a new `since`, so it
+        could never be answered with a 304. `conditional=False` bypasses
+        the cache too, for callers that keep their own copy of the issues.
+        """
+        params = {"state": state, "per_page": PER_PAGE}
+        if since:
+            params["since"] = since
+
+        cacheable = conditional and not since
+        url = f"{self.api}/repos/{owner}/{repo}/issues?{urlencode(params)}"
+        try:
+            while url:
+                page, url = self._get_page(url, cacheable=cacheable)
+                yield from page
+        finally:
+            if cacheable:
+                self.cache.save()
+
+    def list_issues(
+        self,
+        owner: str,
+        repo: str,
+        state: str = "all",
+        since: str | None = None,
+        conditional: bool = True,
+    ):
+        return list(
+            self.iter_issues(owner, repo, state=state, since=since, conditional=conditional)
+        )
 
     def create_issue(self, owner: str, repo: str, title: str, body: str):
         payload = {"title": title, "body": body}
-        r = self.session.post(
+        r = self._request(
+            "POST",
             f"{self.api}/repos/{owner}/{repo}/issues",
             json=payload,
         )
@@ -69,14 +344,352 @@ class GitHubClient:
         return r.json()
 
     def list_open_unscheduled_issues(self, owner: str, repo: str):
-        issues = self.list_issues(owner, repo)
         return [
             i
-            for i in issues
+            for i in self.iter_issues(owner, repo, state="open")
             if "scheduled" not in [l["name"] for l in i["labels"]]
-            and i["state"] == "open"
         ]
 
     def add_label(self, owner: str, repo: str, issue_number: int, label: str):
         url = f"{self.api}/repos/{owner}/{repo}/issues/{issue_number}/labels"
-        self.session.post(url, json={"labels": [label]}).raise_for_status()
+        self._request("POST", url, json={"labels": [label]}).raise_for_status()
+
+    # ---------- Bulk ----------
+
+    def _run_parallel(self, fn, jobs: list, workers: int) -> tuple[list, list]:
+        done, errors = [], []
+        if not jobs:
+            return done, errors
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(fn, *args): key for key, args in jobs}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    done.append(futures[future])
+                except Exception as e:
+                    errors.append((futures[future], str(e)))
+        return done, errors
+
+    def create_issues(
+        self,
+        owner: str,
+        repo: str,
+        items: list[tuple[str, str]],
+        workers: int = MAX_CONCURRENCY,
+    ) -> tuple[list, list]:
+        """
+        Create (title, body) issues on a bounded thread pool.
+        Returns (created_titles, [(title, error), ...]).
+        """
+        jobs = [(title, (owner, repo, title, body)) for title, body in items]
+        return self._run_parallel(self.create_issue, jobs, workers)
+
+    def add_labels(
+        self,
+        owner: str,
+        repo: str,
+        issue_numbers: list[int],
+        label: str,
+        workers: int = MAX_CONCURRENCY,
+    ) -> tuple[list, list]:
+        """
+        Add `label` to every issue in `issue_numbers`.
+        Returns (labelled_numbers, [(number, error), ...]).
+        """
+        jobs = [(n, (owner, repo, n, label)) for n in issue_numbers]
+        return self._run_parallel(self.add_label, jobs, workers)
+
+
+ISSUES_QUERY = """
+query($owner: String!, $name: String!, $cursor: String, $states: [IssueState!], $since: DateTime) {
+  repository(owner: $owner, name: $name) {
+    issues(first: 100, after: $cursor, states: $states, filterBy: {since: $since}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { id number title state url labels(first: 50) { nodes { name } } }
+    }
+  }
+}
+"""
+
+REPO_QUERY = """
+query($owner: String!, $name: String!, $label: String!) {
+  repository(owner: $owner, name: $name) {
+    id
+    label(name: $label) { id }
+  }
+}
+"""
+
+
+class GraphQLError(Exception):
+    pass
+
+
+def graphql_rate_limit_delay(r: requests.Response, errors: list, attempt: int) -> float | None:
+    """
+    Seconds to wait before retrying a GraphQL query that failed with
+    `errors`, or None if none of them is a rate limit.
+    """
+    if not any(e.get("type") == "RATE_LIMITED" for e in errors):
+        return None
+
+    reset = r.headers.get("X-RateLimit-Reset")
+    if r.headers.get("X-RateLimit-Remaining") == "0" and reset and reset.isdigit():
+        return max(1.0, int(reset) - time.time())
+    return SECONDARY_RATE_LIMIT_WAIT * (2 ** attempt)
+
+
+class GitHubGraphQLClient(GitHubClient):
+    """
+    GitHubClient whose issue reads and writes go through the GraphQL API.
+
+    Listing only fetches number, title, state, labels and URL, and creations
+    and label additions are sent as aliased mutation batches, so a repo costs
+    a handful of requests instead of one per ticket.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.graphql_url = f"{self.api}/graphql"
+        self._node_ids: dict[tuple[str, str, int], str] = {}
+        self._repo_ids: dict[tuple[str, str], str] = {}
+
+    def _graphql(self, query: str, variables: dict | None = None) -> tuple[dict, list]:
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            r = self._request(
+                "POST",
+                self.graphql_url,
+                json={"query": query, "variables": variables or {}},
+                idempotent=not query.lstrip().startswith("mutation"),
+            )
+            r.raise_for_status()
+            payload = r.json()
+
+            data = payload.get("data")
+            errors = payload.get("errors", [])
+            if data is not None:
+                return data, errors
+
+            # GraphQL rate limits come back as 200 with a RATE_LIMITED error;
+            # nothing was executed, so the query is retried after the same
+            # throttle as a REST rate limit.
+            delay = graphql_rate_limit_delay(r, errors, attempt)
+            if delay is None or attempt == MAX_RATE_LIMIT_RETRIES:
+                break
+
+            print(f"⏳ GitHub rate limit hit, retrying in {delay:.0f}s")
+            self.limiter.throttle(delay)
+
+        raise GraphQLError("; ".join(e.get("message", "") for e in errors))
+
+    def _batch(self, operation: str, fields: list[tuple[str, dict, str]]):
+        """
+        Send aliased `fields` (alias, {var: (type, value)}, selection) in
+        chunks of GRAPHQL_BATCH_SIZE. Yields (alias, result, error).
+
+        A chunk whose request fails as a whole (HTTP error, no data) yields
+        that error for each of its aliases; the other chunks are still sent.
+        """
+        for i in range(0, len(fields), GRAPHQL_BATCH_SIZE):
+            chunk = fields[i : i + GRAPHQL_BATCH_SIZE]
+            declarations, variables, selections = [], {}, []
+            for alias, args, selection in chunk:
+                for var, (gql_type, value) in args.items():
+                    declarations.append(f"${var}: {gql_type}")
+                    variables[var] = value
+                selections.append(f"{alias}: {selection}")
+
+            signature = f"({', '.join(declarations)})" if declarations else ""
+            query = f"{operation}{signature} {{\n" + "\n".join(selections) + "\n}"
+            try:
+                data, errors = self._graphql(query, variables)
+            except (requests.RequestException, GraphQLError) as e:
+                for alias, _, _ in chunk:
+                    yield alias, None, str(e)
+                continue
+
+            failed = {}
+            for e in errors:
+                path = e.get("path") or []
+                if path:
+                    failed[path[0]] = e.get("message", "GraphQL error")
+
+            for alias, _, _ in chunk:
+                result = data.get(alias)
+                if alias in failed or result is None:
+                    yield alias, None, failed.get(alias, "no result")
+                else:
+                    yield alias, result, None
+
+    # ---------- Issues ----------
+
+    def iter_issues(
+        self,
+        owner: str,
+        repo: str,
+        state: str = "all",
+        since: str | None = None,
+        conditional: bool = True,
+    ):
+        states = None if state == "all" else [state.upper()]
+        cursor = None
+
+        while True:
+            data, _ = self._graphql(
+                ISSUES_QUERY,
+                {
+                    "owner": owner,
+                    "name": repo,
+                    "cursor": cursor,
+                    "states": states,
+                    "since": since,
+                },
+            )
+            issues = data["repository"]["issues"]
+
+            for node in issues["nodes"]:
+                self._node_ids[(owner, repo, node["number"])] = node["id"]
+                yield {
+                    "node_id": node["id"],
+                    "number": node["number"],
+                    "title": node["title"],
+                    "state": node["state"].lower(),
+                    "labels": node["labels"]["nodes"],
+                    "html_url": node["url"],
+                }
+
+            if not issues["pageInfo"]["hasNextPage"]:
+                break
+            cursor = issues["pageInfo"]["endCursor"]
+
+    def _resolve_repo(self, owner: str, repo: str, label: str | None = None) -> tuple[str, str | None]:
+        data, _ = self._graphql(
+            REPO_QUERY, {"owner": owner, "name": repo, "label": label or ""}
+        )
+        repository = data["repository"]
+        self._repo_ids[(owner, repo)] = repository["id"]
+        label_id = (repository.get("label") or {}).get("id")
+        return repository["id"], label_id
+
+    def _ensure_label(self, owner: str, repo: str, label: str) -> str:
+        _, label_id = self._resolve_repo(owner, repo, label)
+        if label_id:
+            return label_id
+
+        r = self._request(
+            "POST",
+            f"{self.api}/repos/{owner}/{repo}/labels",
+            json={"name": label},
+        )
+        r.raise_for_status()
+        return r.json()["node_id"]
+
+    def _issue_node_ids(self, owner: str, repo: str, numbers: list[int]) -> dict[int, str]:
+        missing = [n for n in numbers if (owner, repo, n) not in self._node_ids]
+        fields = [
+            (
+                f"i{n}",
+                {},
+                f"repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) "
+                f"{{ issue(number: {int(n)}) {{ id }} }}",
+            )
+            for n in missing
+        ]
+        for alias, result, _ in self._batch("query", fields):
+            issue = result and result.get("issue")
+            if issue:
+                self._node_ids[(owner, repo, int(alias[1:]))] = issue["id"]
+
+        return {
+            n: self._node_ids[(owner, repo, n)]
+            for n in numbers
+            if (owner, repo, n) in self._node_ids
+        }
+
+    def create_issues(self, owner, repo, items, workers=MAX_CONCURRENCY):
+        if not items:
+            return [], []
+
+        try:
+            repo_id = self._repo_ids.get((owner, repo)) or self._resolve_repo(owner, repo)[0]
+        except (requests.RequestException, GraphQLError) as e:
+            return [], [(title, str(e)) for title, _ in items]
+
+        fields = [
+            (
+                f"c{i}",
+                {
+                    f"t{i}": ("String!", title),
+                    f"b{i}": ("String", body),
+                },
+                f"createIssue(input: {{repositoryId: {json.dumps(repo_id)}, title: $t{i}, body: $b{i}}}) "
+                "{ issue { id number } }",
+            )
+            for i, (title, body) in enumerate(items)
+        ]
+
+        created, errors = [], []
+        for alias, result, error in self._batch("mutation", fields):
+            title = items[int(alias[1:])][0]
+            if error:
+                errors.append((title, error))
+                continue
+            issue = result["issue"]
+            self._node_ids[(owner, repo, issue["number"])] = issue["id"]
+            created.append(title)
+        return created, errors
+
+    def add_labels(self, owner, repo, issue_numbers, label, workers=MAX_CONCURRENCY):
+        if not issue_numbers:
+            return [], []
+
+        try:
+            label_id = self._ensure_label(owner, repo, label)
+        except (requests.RequestException, GraphQLError) as e:
+            return [], [(n, str(e)) for n in issue_numbers]
+        node_ids = self._issue_node_ids(owner, repo, issue_numbers)
+
+        errors = [(n, "issue not found") for n in issue_numbers if n not in node_ids]
+        fields = [
+            (
+                f"l{n}",
+                {f"id{n}": ("ID!", node_id)},
+                f"addLabelsToLabelable(input: {{labelableId: $id{n}, labelIds: [{json.dumps(label_id)}]}}) "
+                "{ clientMutationId }",
+            )
+            for n, node_id in node_ids.items()
+        ]
+
+        labelled = []
+        for alias, _, error in self._batch("mutation", fields):
+            number = int(alias[1:])
+            if error:
+                errors.append((number, error))
+            else:
+                labelled.append(number)
+        return labelled, errors
+
+    def add_label(self, owner: str, repo: str, issue_number: int, label: str):
+        _, errors = self.add_labels(owner, repo, [issue_number], label)
+        if errors:
+            raise GraphQLError(errors[0][1])
+
+
+def make_github_client(cfg: dict | None = None, **kwargs) -> GitHubClient:
+    """
+    Build the GitHub client selected by `github.backend` ("rest" or "graphql").
+    """
+    github_cfg = (cfg or {}).get("github") or {}
+    backend = github_cfg.get("backend", "rest")
+    if github_cfg.get("api_url"):
+        kwargs.setdefault("api", github_cfg["api_url"])
+    kwargs.setdefault(
+        "transport",
+        make_transport(cfg, "github", pool_size=kwargs.get("max_concurrency", MAX_CONCURRENCY) * 2),
+    )
+    if backend == "graphql":
+        return GitHubGraphQLClient(**kwargs)
+    if backend != "rest":
+        raise ValueError(f"Unknown github.backend: {backend}")
+    return GitHubClient(**kwargs)
@@ -1,17 +1,59 @@
-def sync_issues(client, owner: str, repo: str, tickets: list):
-    existing = client.list_issues(owner, repo)
-    existing_titles = {issue["title"] for issue in existing}
+from pcos.defaults import DEFAULT_WORKERS
+from pcos.matcher import TicketMatcher, normalize_title
 
-    created = 0
+
+def sync_issues(
+    client,
+    owner: str,
+    repo: str,
+    tickets: list,
+    workers: int = DEFAULT_WORKERS,
+    matcher: TicketMatcher | None = None,
+    existing: list | None = None,
+):
+    """
+    Create one issue per ticket that has no issue with the same title yet
+    (case and whitespace are ignored, through the TicketMatcher exact index).
+
+    Creations go through `client.create_issues` (a bounded thread pool for
+    REST, aliased mutation batches for GraphQL). `existing` is the current
+    issue list when the caller already has it (e.g. from the state store);
+    otherwise it is listed from GitHub. Returns (created, skipped).
+    """
+    if matcher is None:
+        matcher = TicketMatcher(tickets)
+
+    covered = set()
+    if existing is None:
+        existing = client.iter_issues(owner, repo)
+
+    for issue in existing:
+        ticket = matcher.match_exact(issue["title"])
+        if ticket is not None:
+            covered.add(normalize_title(ticket["name"]))
+
+    pending = []
+    skipped = 0
 
     for d in tickets:
         title = d["name"]
         body = d.get("description", "")
 
-        if title in existing_titles:
+        key = normalize_title(title)
+        if key in covered:
+            skipped += 1
             continue
 
-        client.create_issue(owner, repo, title, body)
-        created += 1
+        covered.add(key)
+        pending.append((title, body))
+
+    created_titles, failures = client.create_issues(owner, repo, pending, workers=workers)
+    created = len(created_titles)
+
+    if failures:
+        raise RuntimeError(
+            f"{len(failures)} issue(s) failed ({created} created, {skipped} skipped): "
+            + "; ".join(f"{title}: {error}" for title, error in failures)
+        )
 
-    return created
+    return created, skipped
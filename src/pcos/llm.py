@@ -1,28 +1,207 @@
+from pathlib import Path
+from typing import Iterator
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+
 import requests
 from pcos.config import get_env
+from pcos.tracing import span, traced
+from pcos.transport import Transport, make_transport
+
+API_BASE = "https://api.openai.com/v1"  # or any OpenAI-compatible server
+MODEL = "gpt-4.1-mini"
+TEMPERATURE = 0.2
+SYSTEM_PROMPT = "You are a precise system."
+
+TOKENS_PER_MINUTE = 200_000
+COMPLETION_TOKENS_ESTIMATE = 2_000
+
+CACHE_DIR = Path.home() / ".config/closure-os/llm_cache"
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose; good enough for budgeting.
+    return len(text) // 4 + 1
+
+
+class TokenBudget:
+    """
+    Token bucket shared by concurrent generations: refills at
+    `tokens_per_minute` and holds callers back until their estimated
+    usage fits, so a batch stays under the account's TPM limit instead of
+    bouncing off 429s. Waiters are served in order.
+    """
+
+    def __init__(self, tokens_per_minute: int = TOKENS_PER_MINUTE):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60
+        self.tokens = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        tokens = min(tokens, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class ResponseCache:
+    """
+    On-disk, content-addressed store of LLM responses: one file per key,
+    the key being a hash of everything that determines the answer.
+
+    Bounded to `max_bytes`; when a write goes over, the least recently used
+    responses (by file mtime, refreshed on every hit) are evicted first.
+    """
+
+    def __init__(self, path: Path = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(**parts) -> str:
+        return sha256_text(json.dumps(parts, sort_keys=True))
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.txt"
+
+    def get(self, key: str) -> str | None:
+        f = self._file(key)
+        try:
+            text = f.read_text(encoding="utf-8")
+            os.utime(f)
+        except OSError:
+            return None
+        return text
+
+    def put(self, key: str, text: str):
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, self._file(key))
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for f in self.path.glob("*.txt"):
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, f))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, f in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            f.unlink(missing_ok=True)
+            total -= size
 
 
 class LLMClient:
-    def __init__(self):
+    def __init__(
+        self,
+        model: str = MODEL,
+        temperature: float = TEMPERATURE,
+        max_connections: int = 10,
+        api_base: str = API_BASE,
+        transport: Transport | None = None,
+    ):
         self.api_key = get_env("OPENAI_API_KEY")
-        self.endpoint = "https://api.openai.com/v1/chat/completions"
+        self.endpoint = f"{api_base.rstrip('/')}/chat/completions"
+        self.model = model
+        self.temperature = temperature
 
-    def generate(self, prompt: str) -> str:
-        payload = {
-            "model": "gpt-4.1-mini",
+        self.transport = transport or Transport("openai", pool_size=max_connections)
+        self.transport.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        })
+
+    def _payload(self, prompt: str) -> dict:
+        return {
+            "model": self.model,
             "messages": [
-                {"role": "system", "content": "You are a precise system."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
-            "temperature": 0.2,
-        }
-
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
+            "temperature": self.temperature,
         }
 
-        r = requests.post(self.endpoint, json=payload, headers=headers)
+    def _post(self, payload: dict, stream: bool = False) -> requests.Response:
+        """
+        POST to the completions endpoint. A completion has no side effect,
+        so it is retried like an idempotent call (connection errors,
+        timeouts, 429 and 5xx).
+        """
+        r = self.transport.post(self.endpoint, json=payload, stream=stream, idempotent=True)
         r.raise_for_status()
+        return r
 
+    @traced("llm.generate")
+    def generate(self, prompt: str) -> str:
+        r = self._post(self._payload(prompt))
         return r.json()["choices"][0]["message"]["content"]
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yield the completion as it is generated (server-sent events).
+
+        Closing the generator early closes the connection, which stops the
+        generation server-side.
+        """
+        payload = self._payload(prompt)
+        payload["stream"] = True
+
+        with span("llm.stream"), self._post(payload, stream=True) as r:
+            r.encoding = "utf-8"
+
+            for line in r.iter_lines(decode_unicode=True):
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                choices = json.loads(data).get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+
+def make_llm_client(cfg: dict, max_connections: int = 10) -> LLMClient:
+    """
+    LLMClient for the `llm` and `http` sections of config.yaml.
+    """
+    llm_cfg = cfg.get("llm", {})
+    return LLMClient(
+        model=llm_cfg.get("model", MODEL),
+        temperature=llm_cfg.get("temperature", TEMPERATURE),
+        max_connections=max_connections,
+        api_base=llm_cfg.get("api_base", API_BASE),
+        transport=make_transport(cfg, "openai", pool_size=max_connections),
+    )
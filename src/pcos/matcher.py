@@ -0,0 +1,86 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+PREFIX_WORDS = 4
+MIN_SHARED_WORDS = 2
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(title.lower().split())
+
+
+class TicketMatcher:
+    """
+    Issue title -> contract ticket index, built once per contract.
+
+    Lookup order:
+    - exact (case/whitespace-insensitive) title hash map
+    - candidates from an inverted index on title words, scored: containment
+      of one title in the other beats shared words among the first
+      PREFIX_WORDS (at least MIN_SHARED_WORDS); ties go to the ticket that
+      comes first in the contract, so results are deterministic.
+    - when no indexed candidate qualifies, a scan for containment inside a
+      word ("Auth" in "Authentication flow"), first ticket in contract order.
+    """
+
+    def __init__(self, tickets: List[Dict]):
+        self.tickets = tickets
+        self.names: List[str] = []
+        self.prefixes: List[set] = []
+        self.exact: Dict[str, int] = {}
+        self.index: Dict[str, List[int]] = defaultdict(list)
+        self._cache: Dict[str, Optional[int]] = {}
+
+        for i, ticket in enumerate(tickets):
+            name = normalize_title(ticket.get("name") or "")
+            words = name.split()
+
+            self.names.append(name)
+            self.prefixes.append(set(words[:PREFIX_WORDS]))
+            if name:
+                self.exact.setdefault(name, i)
+            for word in set(words):
+                self.index[word].append(i)
+
+    def match_exact(self, title: str) -> Optional[Dict]:
+        i = self.exact.get(normalize_title(title))
+        return None if i is None else self.tickets[i]
+
+    def match(self, title: str) -> Optional[Dict]:
+        key = normalize_title(title)
+        if key not in self._cache:
+            self._cache[key] = self._lookup(key)
+
+        i = self._cache[key]
+        return None if i is None else self.tickets[i]
+
+    def _lookup(self, title: str) -> Optional[int]:
+        if title in self.exact:
+            return self.exact[title]
+
+        words = title.split()
+        prefix = set(words[:PREFIX_WORDS])
+
+        candidates = set()
+        for word in set(words):
+            candidates.update(self.index.get(word, ()))
+
+        best = None
+        best_score = (0, 0)
+        for i in sorted(candidates):
+            name = self.names[i]
+            contained = name in title or title in name
+            shared = len(prefix & self.prefixes[i])
+            if not contained and shared < MIN_SHARED_WORDS:
+                continue
+
+            score = (int(contained), shared)
+            if score > best_score:
+                best, best_score = i, score
+
+        if best is None:
+            best = next(
+                (i for i, name in enumerate(self.names) if name and (name in title or title in name)),
+                None,
+            )
+        return best
@@ -1,28 +1,78 @@
-import requests
-import urllib3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable
+import os
+import tempfile
+import threading
+import time
+
 from urllib.parse import quote
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning) # Local only for now
+from pcos.config import get_env
+from pcos.tracing import traced
+
+
+NOTE_CACHE_SIZE = 256
+NOTE_FRESH_SECONDS = 30  # REST notes are served without revalidation this long
 
 
 class ObsidianError(Exception):
     pass
 
 
+class NoteCache:
+    """
+    Thread-safe LRU of note contents keyed by vault path. Each entry keeps
+    the validator it was read with (HTTP ETag/Last-Modified, or mtime and
+    size for local files) so the client can revalidate instead of refetch.
+    """
+
+    def __init__(self, max_entries: int = NOTE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path: str) -> dict | None:
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                self.entries.move_to_end(path)
+            return entry
+
+    def put(self, path: str, content: str, validator, fetched_at: float | None = None):
+        with self.lock:
+            self.entries[path] = {
+                "content": content,
+                "validator": validator,
+                "fetched_at": time.monotonic() if fetched_at is None else fetched_at,
+            }
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, path: str):
+        with self.lock:
+            self.entries.pop(path, None)
+
+
 class ObsidianClient:
-    def __init__(self, base_url: str, vault_name: str, api_key: str):
+    def __init__(self, base_url: str, vault_name: str, api_key: str, transport=None):
         self.base_url = base_url.rstrip("/")
         self.vault_name = vault_name
         self.api_key = api_key
 
-        
-        self.session = requests.Session()
-        self.session.verify = False  # Local only for now
+        # Imported here so filesystem vaults (and `pcos capture`) skip requests.
+        import urllib3
+        from pcos.transport import Transport
+
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning) # Local only for now
 
-        self.session.headers.update({
+        self.transport = transport or Transport("obsidian", verify=False)  # Local only for now
+        self.transport.headers.update({
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "text/plain; charset=utf-8",
         })
+        self.cache = NoteCache()
 
     def _build_note_url(self, path: str) -> str:
         """
@@ -33,25 +83,213 @@ class ObsidianClient:
         note_path = quote(path)
         return f"{self.base_url}/vault/{vault}/{note_path}"
 
+    @traced("obsidian.write_note")
     def write_note(self, path: str, content: str):
         url = self._build_note_url(path)
 
-        r = self.session.put(
+        r = self.transport.put(
             url,
             data=content.encode("utf-8"),
             headers={"Content-Type": "text/plain; charset=utf-8"},
-            timeout=10,
         )
 
+        self.cache.invalidate(path)
+
         if not r.ok:
             raise ObsidianError(
                 f"Failed to write note {path}: {r.status_code} {r.text}"
             )
         
+    @traced("obsidian.write_note_stream")
+    def write_note_stream(self, path: str, chunks: Iterable[str]):
+        """
+        Write a note produced incrementally. A PUT replaces the whole note,
+        so the chunks are collected first: if the producer fails half-way
+        the existing note is left untouched.
+        """
+        self.write_note(path, "".join(chunks))
+
+    @traced("obsidian.read_note")
     def read_note(self, path: str) -> str:
+        cached = self.cache.get(path)
+        if cached and time.monotonic() - cached["fetched_at"] < NOTE_FRESH_SECONDS:
+            return cached["content"]
+
         url = self._build_note_url(path)
 
-        r = self.session.get(url, timeout=10)
+        headers = {}
+        if cached:
+            etag, last_modified = cached["validator"]
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        r = self.transport.get(url, headers=headers)
+        if r.status_code == 304 and cached:
+            self.cache.put(path, cached["content"], cached["validator"])
+            return cached["content"]
         r.raise_for_status()
 
-        return r.text
\ No newline at end of file
+        validator = (r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        self.cache.put(path, r.text, validator)
+        return r.text
+
+    @traced("obsidian.list_dir")
+    def list_dir(self, path: str) -> list[str]:
+        """
+        Entries of a vault directory; sub-directories end with "/".
+        """
+        url = self._build_note_url(path.rstrip("/") + "/")
+
+        r = self.transport.get(url)
+        if not r.ok:
+            raise ObsidianError(
+                f"Failed to list {path}: {r.status_code} {r.text}"
+            )
+
+        return r.json().get("files", [])
+
+
+_umask_value: int | None = None
+
+
+def _umask() -> int:
+    # os.umask can only be read by setting it, so do that once.
+    global _umask_value
+    if _umask_value is None:
+        _umask_value = os.umask(0o022)
+        os.umask(_umask_value)
+    return _umask_value
+
+
+class FilesystemVaultClient:
+    """
+    ObsidianClient look-alike that reads and writes the vault's Markdown
+    files directly, for vaults on local disk (`vault_path` in config.yaml).
+    Obsidian does not need to be running.
+    """
+
+    def __init__(self, vault_path: Path):
+        self.root = Path(vault_path).expanduser().resolve()
+        if not self.root.is_dir():
+            raise ObsidianError(f"Vault directory not found: {self.root}")
+        self.cache = NoteCache()
+
+    def _resolve(self, path: str) -> Path:
+        target = (self.root / path).resolve()
+        if target != self.root and self.root not in target.parents:
+            raise ObsidianError(f"Path escapes the vault: {path}")
+        return target
+
+    @traced("obsidian.write_note")
+    def write_note(self, path: str, content: str):
+        self.write_note_stream(path, [content])
+
+    @traced("obsidian.write_note_stream")
+    def write_note_stream(self, path: str, chunks: Iterable[str]):
+        """
+        Write chunks to disk as they are produced. If the producer raises,
+        the temp file is discarded and the existing note is left untouched.
+        """
+        target = self._resolve(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write a sibling temp file, then rename over the note so readers
+        # (Obsidian included) never see a half-written file.
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates the file 0600: give it the note's current mode,
+            # or what open() would have given a new file.
+            try:
+                mode = os.stat(target).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = 0o666 & ~_umask()
+            os.chmod(tmp, mode)
+            os.replace(tmp, target)
+            self.cache.invalidate(path)
+        except BaseException as e:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            if isinstance(e, OSError):
+                raise ObsidianError(f"Failed to write note {path}: {e}") from e
+            raise
+
+    @traced("obsidian.read_note")
+    def read_note(self, path: str) -> str:
+        target = self._resolve(path)
+
+        try:
+            st = os.stat(target)
+        except OSError as e:
+            raise ObsidianError(f"Failed to read note {path}: {e}") from e
+
+        validator = (st.st_mtime_ns, st.st_size)
+        cached = self.cache.get(path)
+        if cached and cached["validator"] == validator:
+            return cached["content"]
+
+        try:
+            with open(target, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            raise ObsidianError(f"Failed to read note {path}: {e}") from e
+
+        content = data.decode("utf-8")
+        self.cache.put(path, content, validator)
+        return content
+
+    @traced("obsidian.list_dir")
+    def list_dir(self, path: str) -> list[str]:
+        target = self._resolve(path)
+
+        try:
+            entries = sorted(os.scandir(target), key=lambda e: e.name)
+        except OSError as e:
+            raise ObsidianError(f"Failed to list {path}: {e}") from e
+
+        return [
+            e.name + "/" if e.is_dir() else e.name
+            for e in entries
+            if not e.name.startswith(".")
+        ]
+
+
+_clients: dict = {}
+_clients_lock = threading.Lock()
+
+
+def make_obsidian_client(cfg: dict):
+    """
+    Vault client for `cfg`: direct filesystem access when `vault_path` is
+    set, the Local REST API otherwise.
+
+    Clients are shared process-wide per vault, so every caller reuses the
+    same pooled connection and note cache.
+    """
+    if cfg.get("vault_path"):
+        key = ("fs", str(Path(cfg["vault_path"]).expanduser()))
+    else:
+        key = ("rest", cfg["obsidian_api_base"], cfg["vault_name"])
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            if key[0] == "fs":
+                client = FilesystemVaultClient(Path(cfg["vault_path"]))
+            else:
+                from pcos.transport import make_transport
+
+                client = ObsidianClient(
+                    base_url=cfg["obsidian_api_base"],
+                    vault_name=cfg["vault_name"],
+                    api_key=get_env("OBSIDIAN_API_KEY"),
+                    transport=make_transport(cfg, "obsidian", verify=False),
+                )
+            _clients[key] = client
+        return client
@@ -1,18 +1,132 @@
+from datetime import date
 from pathlib import Path
-import yaml
+from typing import Any, Callable, NamedTuple, Optional, Union
 import sys
 
+from pcos.frontmatter import FrontmatterError, parse_frontmatter
+
 
 class ContractError(Exception):
     pass
 
 
-REQUIRED_FIELDS = [
-    "project",
-    "deadline",
-    "tickets",
-    "definition_of_done",
-]
+class Field(NamedTuple):
+    types: tuple
+    required: bool = False
+    # Element spec for lists: a nested schema dict, or a tuple of types.
+    items: Union[dict, tuple, None] = None
+    # Extra check on the value; returns an error message or None.
+    check: Optional[Callable[[Any], Optional[str]]] = None
+
+
+FIBONACCI = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+MAX_TICKETS = 9
+NoneType = type(None)
+
+
+def _non_empty(value) -> Optional[str]:
+    return None if value.strip() else "must not be empty"
+
+
+def _fibonacci(value) -> Optional[str]:
+    if value is None or value in FIBONACCI:
+        return None
+    return f"must be one of {', '.join(map(str, FIBONACCI))} (got {value})"
+
+
+def _ticket_count(value) -> Optional[str]:
+    if not value:
+        return "must be a non-empty list"
+    if len(value) > MAX_TICKETS:
+        return f"must have at most {MAX_TICKETS} tickets (got {len(value)})"
+    return None
+
+
+# The frontmatter PROJECT_CONTRACT_PROMPT asks for, i.e. what publish,
+# schedule and the README renderer rely on.
+TICKET_SCHEMA = {
+    "name": Field((str,), required=True, check=_non_empty),
+    "estimate_slots": Field((int, NoneType), check=_fibonacci),
+    "description": Field((str,)),
+    "scope_excluded": Field((list,), items=(str,)),
+}
+
+CONTRACT_SCHEMA = {
+    "project": Field((str,), required=True, check=_non_empty),
+    "title": Field((str,)),
+    "objective": Field((str,)),
+    "definition_of_done": Field((str,), required=True),
+    "deadline": Field((str, date, NoneType), required=True),
+    "excluded_scope": Field((list,), items=(str,)),
+    "tickets": Field((list,), required=True, items=TICKET_SCHEMA, check=_ticket_count),
+}
+
+
+def _is_a(value, types: tuple) -> bool:
+    # YAML booleans are ints to isinstance; never accept them as numbers.
+    if isinstance(value, bool) and bool not in types:
+        return False
+    return isinstance(value, types)
+
+
+def _type_names(types: tuple) -> str:
+    return " or ".join("null" if t is NoneType else t.__name__ for t in types)
+
+
+def compile_schema(schema: dict) -> Callable[[Any, str], list]:
+    """
+    Turn a {field: Field} schema into a validator `(data, where) -> errors`.
+    Nested schemas, type names and messages are resolved once, here, so
+    validating a contract is a flat run over prebuilt closures.
+    """
+    checks = [_compile_field(name, field) for name, field in schema.items()]
+
+    def validate(data, where: str = "") -> list:
+        if not isinstance(data, dict):
+            return [f"{where or 'frontmatter'} must be an object"]
+        errors = []
+        for check in checks:
+            check(data, where, errors)
+        return errors
+
+    return validate
+
+
+def _compile_field(name: str, field: Field):
+    expected = _type_names(field.types)
+    nested = compile_schema(field.items) if isinstance(field.items, dict) else None
+    item_types = field.items if isinstance(field.items, tuple) else None
+    item_expected = _type_names(item_types) if item_types else ""
+
+    def check(data: dict, where: str, errors: list):
+        path = f"{where}.{name}" if where else name
+        if name not in data:
+            if field.required:
+                errors.append(f"Missing required field: {path}")
+            return
+
+        value = data[name]
+        if not _is_a(value, field.types):
+            errors.append(f"{path} must be {expected}")
+            return
+
+        if field.check:
+            message = field.check(value)
+            if message:
+                errors.append(f"{path} {message}")
+
+        if nested:
+            for i, item in enumerate(value):
+                errors.extend(nested(item, f"{path}[{i}]"))
+        elif item_types:
+            for i, item in enumerate(value):
+                if not _is_a(item, item_types):
+                    errors.append(f"{path}[{i}] must be {item_expected}")
+
+    return check
+
+
+contract_errors = compile_schema(CONTRACT_SCHEMA)
 
 
 def load_contract(path: Path) -> dict:
@@ -25,33 +139,30 @@ def load_contract(path: Path) -> dict:
         raise ContractError("Contract must start with YAML frontmatter")
 
     try:
-        _, yaml_block, _ = text.split("---", 2)
-    except ValueError:
-        raise ContractError("Invalid YAML frontmatter format")
-
-    try:
-        data = yaml.safe_load(yaml_block)
-    except Exception as e:
-        raise ContractError(f"Invalid YAML: {e}")
+        data = parse_frontmatter(text)
+    except FrontmatterError as e:
+        raise ContractError(str(e))
 
     validate_contract(data)
     return data
 
 
 def validate_contract(data: dict) -> None:
-    if not isinstance(data, dict):
-        raise ContractError("Contract YAML must be an object")
+    errors = contract_errors(data)
+    if errors:
+        raise ContractError("; ".join(errors))
 
-    for field in REQUIRED_FIELDS:
-        if field not in data:
-            raise ContractError(f"Missing required field: {field}")
 
-    if not isinstance(data["tickets"], list) or len(data["tickets"]) == 0:
-        raise ContractError("tickets must be a non-empty list")
-
-    for ticket in data["tickets"]:
-        if "title" not in ticket:
-            raise ContractError("Each ticket must have a title")
+def check_contract_text(text: str) -> list:
+    """
+    Every problem with a contract document, [] if it is valid. Top-level
+    and text-only so it can run in a worker process.
+    """
+    try:
+        data = parse_frontmatter(text)
+    except FrontmatterError as e:
+        return [str(e)]
+    return contract_errors(data)
 
 
 def read_input_text(path=None) -> str:
@@ -1,7 +1,169 @@
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Dict, Optional, Tuple
 
+from pcos.matcher import TicketMatcher
+from pcos.tracing import traced
 
+MORNING_HOUR = 7
+EVENING_END_HOUR = 23
+MAX_LOOKAHEAD_DAYS = 365
+
+DAY_MAP = {
+    "MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6
+}
+
+
+def _parse_hhmm(value: str) -> timedelta:
+    hour, _, minute = value.partition(":")
+    return timedelta(hours=int(hour), minutes=int(minute or 0))
+
+
+class SlotCalendar:
+    """
+    Bookable days and time windows, enumerated once from work_days/work_hours.
+
+    Days are integer offsets from `origin` (a midnight). The weekly pattern is
+    a 7-entry mask with a jump table to the next open weekday, so finding the
+    next bookable day is O(1) and a slot's datetime is plain arithmetic,
+    whatever the planning horizon.
+    """
+
+    def __init__(
+        self,
+        origin: datetime,
+        work_day_numbers: set,
+        work_hours: dict,
+        slot_minutes: int,
+    ):
+        self.origin = origin
+        self.origin_weekday = origin.weekday()
+
+        open_days = [wd in work_day_numbers for wd in range(7)]
+        # jump[wd]: days from weekday wd to the next open weekday (0 if open)
+        self.jump: List[Optional[int]] = []
+        for wd in range(7):
+            self.jump.append(
+                next((k for k in range(7) if open_days[(wd + k) % 7]), None)
+            )
+
+        slot = timedelta(minutes=slot_minutes)
+        morning = timedelta(hours=MORNING_HOUR)
+        evening = _parse_hhmm(work_hours["end"])
+        self.morning = (morning, max(_parse_hhmm(work_hours["start"]), morning + slot))
+        self.evening = (evening, max(timedelta(hours=EVENING_END_HOUR), evening + slot))
+
+    def next_open_day(self, day: int) -> Optional[int]:
+        step = self.jump[(self.origin_weekday + day) % 7]
+        return None if step is None else day + step
+
+    def date_of(self, day: int) -> date:
+        return (self.origin + timedelta(days=day)).date()
+
+    def window(self, day: int, evening: bool) -> Tuple[datetime, datetime]:
+        midnight = self.origin + timedelta(days=day)
+        start, end = self.evening if evening else self.morning
+        return midnight + start, midnight + end
+
+
+class BusyIndex:
+    """
+    Busy calendar time as sorted, merged intervals.
+
+    Overlap and gap lookups are a bisect over the interval ends, so placing a
+    slot costs O(log n) in the number of busy blocks. Also counts events per
+    day so the planner can honour `max_events_per_day`.
+
+    Existing events are counted as the freebusy blocks they were given as,
+    and freebusy merges overlapping and back-to-back events into one block,
+    so the count is a lower bound and a busy day may get more events than
+    the cap. Events booked by the planner itself are counted one by one.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[datetime, datetime]] = ()):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        self.per_day: Counter = Counter()
+
+        for start, end in sorted(intervals):
+            self.per_day[start.date()] += 1
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def events_on(self, day: date) -> int:
+        return self.per_day[day]
+
+    def find_gap(
+        self,
+        earliest: datetime,
+        latest_end: datetime,
+        duration: timedelta,
+    ) -> Optional[datetime]:
+        """
+        First start >= earliest such that [start, start + duration) is free
+        and ends by latest_end, or None.
+        """
+        t = earliest
+        i = bisect_right(self.ends, t)  # first block still running after t
+
+        while t + duration <= latest_end:
+            if i == len(self.starts) or self.starts[i] >= t + duration:
+                return t
+            t = max(t, self.ends[i])
+            i += 1
+
+        return None
+
+    def add(self, start: datetime, end: datetime):
+        self.per_day[start.date()] += 1
+
+        i = bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+
+        # Merge with the previous block, then swallow any following ones.
+        if i > 0 and self.ends[i - 1] >= start:
+            i -= 1
+            self.ends[i] = max(self.ends[i], self.ends[i + 1])
+            del self.starts[i + 1], self.ends[i + 1]
+        while i + 1 < len(self.starts) and self.starts[i + 1] <= self.ends[i]:
+            self.ends[i] = max(self.ends[i], self.ends[i + 1])
+            del self.starts[i + 1], self.ends[i + 1]
+
+
+@traced("scheduler.estimate_issues")
+def estimate_issues(
+    issues: List[Dict],
+    tickets: List[Dict],
+    matcher: Optional[TicketMatcher] = None,
+) -> List[tuple]:
+    """
+    Pair each issue with its contract ticket and estimate (3 slots when the
+    issue matches no ticket or the ticket has no estimate).
+
+    Returns:
+        List of tuples: (issue, ticket_or_None, estimate)
+    """
+    if matcher is None:
+        matcher = TicketMatcher(tickets)
+
+    issue_ticket_pairs = []
+    for issue in issues:
+        ticket = matcher.match(issue["title"])
+        if ticket:
+            estimate = ticket.get("estimate_slots") or 3
+            issue_ticket_pairs.append((issue, ticket, estimate))
+        else:
+            issue_ticket_pairs.append((issue, None, 3))
+
+    return issue_ticket_pairs
+
+
+@traced("scheduler.plan_smart_schedule")
 def plan_smart_schedule(
     issues: List[Dict],
     tickets: List[Dict],
@@ -10,17 +172,23 @@ def plan_smart_schedule(
     slot_minutes: int,
     work_days: list = None,
     rest_days_per_week: int = 1,
+    busy: Optional[BusyIndex] = None,
+    max_events_per_day: Optional[int] = None,
+    matcher: Optional[TicketMatcher] = None,
+    until: Optional[datetime] = None,
 ) -> List[tuple]:
     """
     Intelligently schedule issues based on their estimates.
     
     Algorithm:
-    - Match issues with tickets from contract by title similarity
+    - Match issues with tickets from contract by title similarity (TicketMatcher)
     - Sort tickets by estimate (smallest first for quick wins)
     - Space slots based on estimate: estimate_slots = days between tickets
     - One slot per ticket
     - Schedule outside working hours
     - Leave rest days (weekends + personal time)
+    - Skip time that is already busy in the calendar, and days that already
+      hold `max_events_per_day` events
     
     Args:
         issues: List of GitHub issues (dict with 'title', 'number', etc.)
@@ -30,84 +198,103 @@ def plan_smart_schedule(
         slot_minutes: Duration of each slot
         work_days: List of work days
         rest_days_per_week: Number of rest days per week (default: 1 for weekends)
+        busy: Existing calendar occupation (see CalendarClient.busy_intervals)
+        max_events_per_day: Cap on events per day, existing ones included
+            (approximate: see BusyIndex)
+        matcher: Prebuilt TicketMatcher for `tickets` (built here if omitted)
+        until: End of the planning horizon (the end of the window `busy`
+            was read for); issues that do not fit before it are left out
     
     Returns:
         List of tuples: (issue, slot_datetime, estimate)
     """
+    return allocate_slots(
+        estimate_issues(issues, tickets, matcher),
+        start_date=start_date,
+        work_hours=work_hours,
+        slot_minutes=slot_minutes,
+        work_days=work_days,
+        rest_days_per_week=rest_days_per_week,
+        busy=busy,
+        max_events_per_day=max_events_per_day,
+        until=until,
+    )
+
+
+@traced("scheduler.allocate_slots")
+def allocate_slots(
+    issue_ticket_pairs: List[tuple],
+    start_date: datetime,
+    work_hours: dict,
+    slot_minutes: int,
+    work_days: list = None,
+    rest_days_per_week: int = 1,
+    busy: Optional[BusyIndex] = None,
+    max_events_per_day: Optional[int] = None,
+    until: Optional[datetime] = None,
+) -> List[tuple]:
+    """
+    Place already-estimated (issue, ticket, estimate) pairs on the calendar,
+    smallest estimate first. The pairs may come from several projects: the
+    shared `busy` index is the capacity model that keeps them apart.
+    See plan_smart_schedule for the placement rules.
+
+    No slot ends after `until`: past it `busy` knows nothing of existing
+    events. Pairs that do not fit are left out of the returned schedule.
+    """
 
     if work_days is None:
         work_days = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
     else:
-        work_days_set = set(day.upper() for day in work_days)
-        if "SA" not in work_days_set:
-            work_days.append("SA")
-        if "SU" not in work_days_set:
-            work_days.append("SU")
-    
-    day_map = {
-        "MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6
-    }
-    work_day_numbers = {day_map.get(day.upper(), -1) for day in work_days}
-    
-    def match_issue_to_ticket(issue_title: str, tickets: List[Dict]) -> Optional[Dict]:
-        """Match issue title with ticket name (simple substring matching)"""
-        issue_lower = issue_title.lower()
-        for ticket in tickets:
-            ticket_name = ticket.get("name", "").lower()
-            if ticket_name in issue_lower or issue_lower in ticket_name:
-                return ticket
-            issue_words = set(issue_lower.split()[:4])
-            ticket_words = set(ticket_name.split()[:4])
-            if len(issue_words.intersection(ticket_words)) >= 2:
-                return ticket
-        return None
+        work_days = [day.upper() for day in work_days] + ["SA", "SU"]
     
-    issue_ticket_pairs = []
-    for issue in issues:
-        ticket = match_issue_to_ticket(issue["title"], tickets)
-        if ticket:
-            estimate = ticket.get("estimate_slots") or 3
-            issue_ticket_pairs.append((issue, ticket, estimate))
-        else:
-            issue_ticket_pairs.append((issue, None, 3))
+    work_day_numbers = {DAY_MAP.get(day.upper(), -1) for day in work_days}
     
-    issue_ticket_pairs.sort(key=lambda x: x[2])
+    issue_ticket_pairs = sorted(issue_ticket_pairs, key=lambda x: x[2])
     
+    now = datetime.now()
+    first_day = max(start_date.date(), now.date())
+    origin = datetime.combine(first_day, datetime.min.time())
+
+    slots = SlotCalendar(origin, work_day_numbers, work_hours, slot_minutes)
+
+    if busy is None:
+        busy = BusyIndex()
+    slot_length = timedelta(minutes=slot_minutes)
+
+    # Day offsets from origin up to (excluding) this one may hold slots.
+    horizon = None if until is None else (until.date() - first_day).days + 1
+
     schedule = []
-    current_date = start_date.replace(hour=18, minute=0, second=0, microsecond=0)  # Start evening
-    if current_date < datetime.now():
-        current_date = datetime.now().replace(hour=18, minute=0, second=0, microsecond=0)
-    
-    start_hour = int(work_hours["start"].split(":")[0])
-    start_minute = int(work_hours["start"].split(":")[1]) if ":" in work_hours["start"] and len(work_hours["start"].split(":")[1]) > 0 else 0
-    end_hour = int(work_hours["end"].split(":")[0])
-    end_minute = int(work_hours["end"].split(":")[1]) if ":" in work_hours["end"] and len(work_hours["end"].split(":")[1]) > 0 else 0
-    
-    morning_hour = 7
-    morning_minute = 0
-    
-    evening_hour = end_hour
-    evening_minute = end_minute
-    
+    cursor = 0  # day offset from origin where the next search starts
     consecutive_work_days = 0
     max_consecutive_days = 7
     
     for issue, ticket, estimate in issue_ticket_pairs:
         slot_found = False
-        attempts = 0
-        max_attempts = 365
-        
-        while not slot_found and attempts < max_attempts:
-            if current_date.weekday() in work_day_numbers:
+        limit = cursor + MAX_LOOKAHEAD_DAYS
+        if horizon is not None:
+            if cursor >= horizon:
+                break  # the caller reports what is left
+            limit = min(limit, horizon)
+        day = slots.next_open_day(cursor)
+
+        while day is not None and day < limit:
+            day_full = (
+                max_events_per_day is not None
+                and busy.events_on(slots.date_of(day)) >= max_events_per_day
+            )
+            if not day_full:
                 use_morning = len(schedule) % 2 == 0
-                
-                if use_morning:
-                    slot_time = current_date.replace(hour=morning_hour, minute=morning_minute)
-                else:
-                    slot_time = current_date.replace(hour=evening_hour, minute=evening_minute)
-                
-                if slot_time > datetime.now():
+                window_start, window_end = slots.window(day, evening=not use_morning)
+                if until is not None:
+                    window_end = min(window_end, until)
+
+                slot_time = busy.find_gap(window_start, window_end, slot_length)
+
+                if slot_time and slot_time > now:
                     schedule.append((issue, slot_time, estimate))
+                    busy.add(slot_time, slot_time + slot_length)
                     slot_found = True
                     
                     # Calculate spacing based on estimate
@@ -121,19 +308,21 @@ def plan_smart_schedule(
                     else:
                         days_spacing = max(3, estimate // 2)
                     
-                    current_date += timedelta(days=days_spacing)
+                    cursor = day + days_spacing
                     consecutive_work_days += days_spacing
                     
                     if consecutive_work_days >= max_consecutive_days:
-                        current_date += timedelta(days=rest_days_per_week)
+                        cursor += rest_days_per_week
                         consecutive_work_days = 0
                     
                     break
-            
-            current_date += timedelta(days=1)
-            attempts += 1
+
+            day = slots.next_open_day(day + 1)
         
         if not slot_found:
+            if limit == horizon:
+                break  # same search for the next ones; the caller reports them
+            cursor = limit
             print(f"⚠️ Could not schedule issue #{issue['number']}: {issue['title']}")
     
     return schedule
@@ -0,0 +1,275 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+
+STATE_PATH = Path.home() / ".config/closure-os/state.db"
+# Re-fetch a little before the last cursor to absorb clock skew with GitHub.
+SYNC_OVERLAP = timedelta(minutes=1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contracts (
+    project TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS issues (
+    repo TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    state TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    html_url TEXT,
+    ticket TEXT,
+    PRIMARY KEY (repo, number)
+);
+CREATE TABLE IF NOT EXISTS events (
+    repo TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    start TEXT NOT NULL,
+    PRIMARY KEY (repo, number)
+);
+CREATE TABLE IF NOT EXISTS readmes (
+    repo TEXT PRIMARY KEY,
+    sha TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS brainstorms (
+    project TEXT PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _utc_now(offset: timedelta = timedelta(0)) -> str:
+    return (datetime.now(timezone.utc) + offset).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def contract_hash(contract: dict) -> str:
+    raw = json.dumps(contract, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class StateStore:
+    """
+    Local SQLite record of what pcos already knows: contract hashes, the
+    brainstorm each contract was generated from, the issues of each repo
+    (with the ticket they belong to), the calendar event booked for each
+    issue and the incremental sync cursors.
+
+    Safe to share between threads; writes are serialized.
+    """
+
+    def __init__(self, path: Path = STATE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- Contracts ----------
+
+    def record_contract(self, project: str, contract: dict) -> bool:
+        """
+        Store the contract hash; returns True if it changed since last time.
+        """
+        h = contract_hash(contract)
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT hash FROM contracts WHERE project = ?", (project,)
+            ).fetchone()
+            if row and row["hash"] == h:
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO contracts VALUES (?, ?, ?)",
+                (project, h, _utc_now()),
+            )
+        return True
+
+    # ---------- Brainstorms ----------
+
+    def brainstorm_hash(self, project: str) -> str | None:
+        """
+        Hash of the brainstorm the project's contract was generated from.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT hash FROM brainstorms WHERE project = ?", (project,)
+            ).fetchone()
+        return row["hash"] if row else None
+
+    def record_brainstorm(self, project: str, h: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO brainstorms VALUES (?, ?)", (project, h)
+            )
+
+    # ---------- READMEs ----------
+
+    def readme_sha(self, repo: str) -> str | None:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT sha FROM readmes WHERE repo = ?", (repo,)
+            ).fetchone()
+        return row["sha"] if row else None
+
+    def record_readme(self, repo: str, sha: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO readmes VALUES (?, ?)", (repo, sha)
+            )
+
+    # ---------- Cursors ----------
+
+    def get_cursor(self, key: str) -> str | None:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM cursors WHERE key = ?", (key,)
+            ).fetchone()
+        return row["value"] if row else None
+
+    def set_cursor(self, key: str, value: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cursors VALUES (?, ?)", (key, value)
+            )
+
+    # ---------- Repos ----------
+
+    def forget_repo(self, repo: str):
+        """
+        Drop everything recorded for `repo` (issues, events, README SHA and
+        issue cursor), e.g. when it was deleted and created again on GitHub.
+        """
+        with self.lock, self.conn:
+            for table in ("issues", "events", "readmes"):
+                self.conn.execute(f"DELETE FROM {table} WHERE repo = ?", (repo,))
+            self.conn.execute("DELETE FROM cursors WHERE key = ?", (f"issues:{repo}",))
+
+    # ---------- Issues ----------
+
+    def upsert_issues(self, repo: str, issues: list[dict]):
+        rows = [
+            (
+                repo,
+                i["number"],
+                i["title"],
+                i["state"],
+                json.dumps([l["name"] for l in i.get("labels", [])]),
+                i.get("html_url"),
+            )
+            for i in issues
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO issues (repo, number, title, state, labels, html_url)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (repo, number) DO UPDATE SET
+                    title = excluded.title,
+                    state = excluded.state,
+                    labels = excluded.labels,
+                    html_url = excluded.html_url
+                """,
+                rows,
+            )
+
+    def issues(self, repo: str, state: str = "all") -> list[dict]:
+        query = "SELECT * FROM issues WHERE repo = ?"
+        params = [repo]
+        if state != "all":
+            query += " AND state = ?"
+            params.append(state)
+
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY number", params).fetchall()
+
+        return [
+            {
+                "number": r["number"],
+                "title": r["title"],
+                "state": r["state"],
+                "labels": [{"name": name} for name in json.loads(r["labels"])],
+                "html_url": r["html_url"],
+                "ticket": r["ticket"],
+            }
+            for r in rows
+        ]
+
+    def map_tickets(self, repo: str, pairs: list[tuple[int, str]]):
+        """
+        Record (issue number, ticket name) links.
+        """
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE issues SET ticket = ? WHERE repo = ? AND number = ?",
+                [(ticket, repo, number) for number, ticket in pairs],
+            )
+
+    # ---------- Events ----------
+
+    def record_events(self, repo: str, events: list[tuple[int, str, str, datetime]]):
+        """
+        Record booked (issue number, calendar id, event id, start) events.
+        """
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?)",
+                [
+                    (repo, number, calendar_id, event_id, start.isoformat())
+                    for number, calendar_id, event_id, start in events
+                ],
+            )
+
+    def scheduled_numbers(self, repo: str) -> set[int]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT number FROM events WHERE repo = ?", (repo,)
+            ).fetchall()
+        return {r["number"] for r in rows}
+
+
+def refresh_issues(store: StateStore, gh, owner: str, repo: str) -> list[dict]:
+    """
+    Bring the local copy of a repo's issues up to date by fetching only the
+    issues updated since the last refresh, then return all of them.
+
+    The store is the cache here: the listing skips the client's ETag cache,
+    which could never answer a later `since=` listing.
+    """
+    key = f"{owner}/{repo}"
+    cursor_key = f"issues:{key}"
+
+    started = _utc_now(-SYNC_OVERLAP)
+    delta = gh.list_issues(
+        owner, repo, since=store.get_cursor(cursor_key), conditional=False
+    )
+
+    store.upsert_issues(key, delta)
+    store.set_cursor(cursor_key, started)
+    return store.issues(key)
+
+
+def open_unscheduled_issues(store: StateStore, gh, owner: str, repo: str) -> list[dict]:
+    """
+    Open issues with neither the `scheduled` label nor a recorded event.
+    """
+    booked = store.scheduled_numbers(f"{owner}/{repo}")
+    return [
+        i
+        for i in refresh_issues(store, gh, owner, repo)
+        if i["state"] == "open"
+        and i["number"] not in booked
+        and "scheduled" not in [l["name"] for l in i["labels"]]
+    ]
@@ -0,0 +1,234 @@
+# Spans and per-endpoint HTTP statistics for `pcos --profile`.
+#
+# Nothing is recorded unless enable() was called: span() then hands back a
+# shared no-op context manager, traced() costs one extra call and a global
+# lookup, and HTTP clients are only wrapped when created while tracing is on.
+
+from collections import defaultdict
+from pathlib import Path
+import contextlib
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+_tracer = None
+_NOOP = contextlib.nullcontext()
+
+# Collapse ids and names in URLs so requests group by endpoint.
+ENDPOINT_RULES = [
+    (re.compile(r"^/repos/[^/]+/[^/]+"), "/repos/{owner}/{repo}"),
+    (re.compile(r"^/vault/.*"), "/vault/{path}"),
+    (re.compile(r"/calendars/[^/]+"), "/calendars/{id}"),
+    (re.compile(r"/\d+(?=/|$)"), "/{n}"),
+]
+
+
+def endpoint_of(method: str, url: str) -> str:
+    match = re.match(r"^[a-z]+://([^/?#]+)([^?#]*)", url)
+    host, path = match.groups() if match else ("", url)
+    for pattern, replacement in ENDPOINT_RULES:
+        path = pattern.sub(replacement, path)
+    return f"{method.upper()} {host}{path or '/'}"
+
+
+class Tracer:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events: list[dict] = []  # list.append is atomic: no lock
+
+    def record(self, name: str, cat: str, start: float, end: float, args: dict):
+        self.events.append({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (start - self.origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, "phase", start, time.perf_counter(), args)
+
+    def record_request(
+        self,
+        service: str,
+        method: str,
+        url: str,
+        status,
+        sent: int,
+        received: int,
+        start: float,
+        end: float,
+    ):
+        self.record(
+            endpoint_of(method, url),
+            "http",
+            start,
+            end,
+            {"service": service, "status": status, "sent": sent, "received": received},
+        )
+
+    def write_chrome_trace(self, path: Path):
+        """
+        Trace Event Format JSON, for chrome://tracing or ui.perfetto.dev.
+        """
+        path.write_text(json.dumps({"traceEvents": self.events, "displayTimeUnit": "ms"}))
+
+    def print_summary(self):
+        from rich.console import Console
+        from rich.markup import escape
+        from rich.table import Table
+
+        phases = defaultdict(lambda: [0, 0.0])
+        endpoints = defaultdict(lambda: [0, 0, 0, 0.0, 0.0])
+        for e in self.events:
+            if e["cat"] == "http":
+                stats = endpoints[(e["args"]["service"], e["name"])]
+                stats[0] += 1
+                stats[1] += e["args"]["sent"]
+                stats[2] += e["args"]["received"]
+                stats[3] += e["dur"] / 1000
+                stats[4] = max(stats[4], e["dur"] / 1000)
+            else:
+                phases[e["name"]][0] += 1
+                phases[e["name"]][1] += e["dur"] / 1000
+
+        console = Console(stderr=True)
+
+        table = Table(title="Phases")
+        for column in ("Span", "Calls", "Total (ms)"):
+            table.add_column(column, justify="left" if column == "Span" else "right")
+        for name, (count, total) in sorted(phases.items(), key=lambda kv: -kv[1][1]):
+            table.add_row(escape(name), str(count), f"{total:.1f}")
+        console.print(table)
+
+        if not endpoints:
+            return
+
+        table = Table(title="HTTP endpoints")
+        for column in ("Service", "Endpoint", "Requests", "Sent", "Received", "Total (ms)", "Max (ms)"):
+            table.add_column(column, justify="left" if column in ("Service", "Endpoint") else "right")
+        for (service, name), (count, sent, received, total, worst) in sorted(
+            endpoints.items(), key=lambda kv: -kv[1][3]
+        ):
+            table.add_row(
+                service, escape(name), str(count), _size(sent), _size(received),
+                f"{total:.1f}", f"{worst:.1f}",
+            )
+        console.print(table)
+
+
+def _size(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024 or unit == "MB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def enable() -> Tracer:
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable():
+    global _tracer
+    _tracer = None
+
+
+def span(name: str, **args):
+    """
+    `with span("phase", key=value):` times the block when tracing is on.
+    """
+    tracer = _tracer
+    return _NOOP if tracer is None else tracer.span(name, **args)
+
+
+def traced(name: str):
+    """
+    Decorator form of span() for functions and methods.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def instrument_session(session, service: str):
+    """
+    Record every request made through a requests.Session. Bodies of
+    streamed responses are not read here, so they count their
+    Content-Length (0 when the server does not send one).
+    """
+    tracer = _tracer
+    if tracer is None:
+        return
+
+    request = session.request
+
+    def traced_request(method, url, *args, **kwargs):
+        start = time.perf_counter()
+        r = None
+        try:
+            r = request(method, url, *args, **kwargs)
+            return r
+        finally:
+            end = time.perf_counter()
+            if r is None:
+                status, sent, received = "error", 0, 0
+            else:
+                status = r.status_code
+                sent = len(r.request.body or b"")
+                if kwargs.get("stream"):
+                    received = int(r.headers.get("Content-Length") or 0)
+                else:
+                    received = len(r.content)
+            tracer.record_request(service, method, url, status, sent, received, start, end)
+
+    session.request = traced_request
+
+
+def instrument_http(http, service: str):
+    """
+    Same as instrument_session for an httplib2-style `http` object (what
+    googleapiclient sends its requests through).
+    """
+    tracer = _tracer
+    if tracer is None:
+        return
+
+    request = http.request
+
+    def traced_request(uri, method="GET", body=None, *args, **kwargs):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = request(uri, method, body, *args, **kwargs)
+            return result
+        finally:
+            end = time.perf_counter()
+            if result is None:
+                status, received = "error", 0
+            else:
+                resp, content = result
+                status, received = resp.status, len(content or b"")
+            tracer.record_request(service, method, uri, status, len(body or b""), received, start, end)
+
+    http.request = traced_request
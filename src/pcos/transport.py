@@ -0,0 +1,356 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+import requests
+import requests.adapters
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from pcos.config import ConfigError
+from pcos.tracing import instrument_session
+
+# (connect, read) timeouts in seconds. The read timeout bounds each wait for
+# the next bytes, not the whole response (a streamed completion may take
+# longer). Overridden by http.timeouts.<service> in config.yaml.
+SERVICE_TIMEOUTS = {
+    "github": (5, 30),
+    "openai": (10, 120),
+    "obsidian": (3, 10),
+    "calendar": (5, 60),
+}
+DEFAULT_TIMEOUT = (5, 30)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+POOL_SIZE = 10
+
+# Connection-specific headers, forbidden in HTTP/2 requests.
+HOP_BY_HOP_HEADERS = frozenset({"connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade"})
+
+_sessions: dict = {}
+_sessions_lock = threading.Lock()
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    "Full jitter" exponential backoff: a random delay up to
+    BACKOFF_BASE * 2**attempt (capped at BACKOFF_MAX), so concurrent
+    callers that failed together do not retry together.
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def retry_after(r: requests.Response) -> float | None:
+    """
+    Seconds the server asked to wait (retry-after-ms, or Retry-After in
+    seconds or as an HTTP date), None when it did not say.
+    """
+    retry_after_ms = r.headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    value = r.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def transport_settings(cfg: dict | None, service: str) -> dict:
+    """
+    Timeout, retries and HTTP/2 flag for `service` from the `http` section
+    of config.yaml:
+
+        http:
+          http2: false
+          retries: 5
+          timeouts:
+            github: [5, 30]  # [connect, read], or one number for both
+    """
+    http_cfg = (cfg or {}).get("http") or {}
+    timeout = (http_cfg.get("timeouts") or {}).get(service)
+    if timeout is None:
+        timeout = SERVICE_TIMEOUTS.get(service, DEFAULT_TIMEOUT)
+    elif isinstance(timeout, (int, float)):
+        timeout = (timeout, timeout)
+    elif isinstance(timeout, list) and len(timeout) == 2:
+        timeout = tuple(timeout)
+    else:
+        raise ConfigError(f"http.timeouts.{service} must be a number or [connect, read]")
+
+    return {
+        "timeout": timeout,
+        "retries": int(http_cfg.get("retries", MAX_RETRIES)),
+        "http2": bool(http_cfg.get("http2", False)),
+    }
+
+
+class _HTTPXBody:
+    """
+    File-like view of a streamed httpx response, as requests expects in
+    Response.raw. read() returns what has arrived instead of waiting for
+    `amt` bytes, so server-sent events are not held back.
+    """
+
+    def __init__(self, response):
+        import httpx
+
+        self.response = response
+        self.chunks = response.iter_bytes()
+        self.buffer = b""
+        self.errors = (httpx.TransportError, httpx.StreamError)
+
+    def read(self, amt: int | None = None, **_) -> bytes:
+        try:
+            if amt is None:
+                data, self.buffer = self.buffer + b"".join(self.chunks), b""
+                return data
+            while not self.buffer:
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    return b""
+                self.buffer = chunk
+        except self.errors as e:
+            raise requests.ConnectionError(e) from e
+
+        data, self.buffer = self.buffer[:amt], self.buffer[amt:]
+        return data
+
+    def close(self):
+        self.response.close()
+
+
+class HTTP2Adapter(requests.adapters.BaseAdapter):
+    """
+    requests adapter sending through an httpx client with HTTP/2 enabled,
+    so concurrent requests to a host share one multiplexed connection.
+    Servers that do not negotiate h2 (and plain http://) get HTTP/1.1.
+
+    Needs the optional `httpx[http2]` dependency (pip install 'pcos[http2]').
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        super().__init__()
+        try:
+            import h2  # noqa: F401
+            import httpx
+        except ImportError as e:
+            raise ConfigError("http.http2 needs httpx[http2]: pip install 'pcos[http2]'") from e
+
+        self.httpx = httpx
+        # Callers bound their own concurrency; only idle connections are
+        # capped, so the adapter never has to be replaced to grow.
+        self.limits = httpx.Limits(max_connections=None, max_keepalive_connections=pool_size)
+        self.clients: dict = {}  # one httpx client per TLS `verify` setting
+        self.lock = threading.Lock()
+
+    def _client(self, verify):
+        with self.lock:
+            client = self.clients.get(verify)
+            if client is None:
+                client = self.httpx.Client(http2=True, verify=verify, limits=self.limits)
+                self.clients[verify] = client
+            return client
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        httpx = self.httpx
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+
+        client = self._client(verify)
+        hx_request = client.build_request(
+            request.method,
+            request.url,
+            headers={k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS},
+            content=request.body,
+            timeout=httpx.Timeout(connect=connect, read=read, write=read, pool=connect),
+        )
+        try:
+            hx_response = client.send(hx_request, stream=True)
+        except httpx.ConnectTimeout as e:
+            raise requests.ConnectTimeout(e, request=request) from e
+        except httpx.TimeoutException as e:
+            raise requests.ReadTimeout(e, request=request) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e, request=request) from e
+
+        response = requests.Response()
+        response.status_code = hx_response.status_code
+        response.reason = hx_response.reason_phrase
+        response.headers = CaseInsensitiveDict(hx_response.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _HTTPXBody(hx_response)
+        response.url = str(hx_response.url)
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        with self.lock:
+            for client in self.clients.values():
+                client.close()
+            self.clients.clear()
+
+
+def _mount(session: requests.Session, pool_size: int, http2: bool):
+    if http2:
+        adapter = HTTP2Adapter(pool_size)
+    else:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def _close_adapter(adapter: requests.adapters.BaseAdapter):
+    # urllib3 2 drops the pools of a cleared PoolManager without closing
+    # them, leaving their idle sockets to the garbage collector.
+    managers = [getattr(adapter, "poolmanager", None), *getattr(adapter, "proxy_manager", {}).values()]
+    for manager in filter(None, managers):
+        for key in manager.pools.keys():
+            pool = manager.pools.get(key)
+            if pool is not None:
+                pool.close()
+    adapter.close()
+
+
+def shared_session(service: str, pool_size: int = POOL_SIZE, http2: bool = False) -> requests.Session:
+    """
+    The process-wide keep-alive session of `service`, its pool grown to at
+    least `pool_size` connections per host (the HTTP/2 adapter is not
+    capped, see HTTP2Adapter). Separate services never share a pool, so a
+    slow one cannot starve the others of connections.
+    """
+    key = (service, http2)
+    with _sessions_lock:
+        entry = _sessions.get(key)
+        if entry is None:
+            session = requests.Session()
+            _mount(session, pool_size, http2)
+            instrument_session(session, service)
+            _sessions[key] = [session, pool_size]
+            return session
+
+        session, size = entry
+        if pool_size > size and not http2:
+            # Closing the old pool drops its idle keep-alive sockets; the
+            # connections of in-flight requests are closed when released.
+            old = session.get_adapter("https://")
+            _mount(session, pool_size, http2)
+            _close_adapter(old)
+            entry[1] = pool_size
+        return session
+
+
+class Transport:
+    """
+    What clients send their requests through: the service's shared pooled
+    session, its timeouts, and retries with jittered exponential backoff.
+
+    `headers` (typically auth) are added to every request of this
+    transport, so clients with different credentials can share a pool.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        headers: dict | None = None,
+        timeout: tuple[float, float] | None = None,
+        retries: int = MAX_RETRIES,
+        pool_size: int = POOL_SIZE,
+        http2: bool = False,
+        verify: bool = True,
+    ):
+        self.service = service
+        self.headers = dict(headers or {})
+        self.timeout = timeout or SERVICE_TIMEOUTS.get(service, DEFAULT_TIMEOUT)
+        self.retries = retries
+        self.verify = verify
+        self.session = shared_session(service, pool_size, http2)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: dict | None = None,
+        idempotent: bool | None = None,
+        retry_statuses=RETRY_STATUSES,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        requests.Session.request with this transport's headers, timeout and
+        retries: connection errors, timeouts and `retry_statuses` are
+        retried after the server's Retry-After, or a jittered backoff.
+
+        Requests that may have reached the server (a timeout while reading,
+        a 5xx) are only retried when idempotent: by method, or as the
+        caller says with `idempotent`. A connect timeout or a 429 means the
+        request was not processed, so those are retried whatever the method.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("verify", self.verify)
+        headers = {**self.headers, **(headers or {})}
+
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                r = self.session.request(method, url, headers=headers, **kwargs)
+            except requests.ConnectTimeout:
+                if last:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                continue
+            except (requests.ConnectionError, requests.Timeout):
+                if last or not idempotent:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            if r.status_code in retry_statuses and not last and (idempotent or r.status_code == 429):
+                delay = retry_after(r)
+                r.close()
+                time.sleep(backoff_delay(attempt) if delay is None else delay)
+                continue
+            return r
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+
+def make_transport(
+    cfg: dict | None,
+    service: str,
+    headers: dict | None = None,
+    pool_size: int = POOL_SIZE,
+    verify: bool = True,
+) -> Transport:
+    """
+    Transport for `service` configured from the `http` section of config.yaml.
+    """
+    return Transport(
+        service,
+        headers=headers,
+        pool_size=pool_size,
+        verify=verify,
+        **transport_settings(cfg, service),
+    )